@@ -0,0 +1,53 @@
+import secrets
+from fastapi import APIRouter, HTTPException, Depends, Header
+from typing import Optional
+from app.api.schemas import InsightsBatchRequest
+from app.core.config import settings
+from app.core.serialization import FastJSONResponse
+from app.services.insights_batch import insights_batch
+
+router = APIRouter()
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)):
+    """Batch endpoints read any user's data, so they need the admin X-Admin-Token header"""
+    if not (settings.ADMIN_API_TOKEN and x_admin_token
+            and secrets.compare_digest(x_admin_token, settings.ADMIN_API_TOKEN)):
+        raise HTTPException(
+            status_code=403,
+            detail="Admin token required"
+        )
+
+
+@router.post("/batch", dependencies=[Depends(require_admin_token)], response_class=FastJSONResponse)
+async def generate_insights_batch(request: InsightsBatchRequest):
+    """
+    Generate processed insights for many users in one call (e.g. monthly digests)
+    One query reads every user's transactions; users are processed in
+    parallel worker processes. Users without transactions in the range are
+    listed under missing.
+    """
+    if len(request.user_ids) > settings.INSIGHTS_BATCH_MAX_USERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.INSIGHTS_BATCH_MAX_USERS} users per batch"
+        )
+    
+    try:
+        results, missing = await insights_batch.run(
+            [str(user_id) for user_id in request.user_ids],
+            request.start_date,
+            request.end_date
+        )
+        
+        return FastJSONResponse({
+            "results": results,
+            "count": len(results),
+            "missing": missing
+        })
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error generating insights batch: {str(e)}"
+        )
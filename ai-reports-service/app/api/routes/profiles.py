@@ -0,0 +1,50 @@
+import secrets
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from typing import Optional
+from app.core.config import settings
+from app.core import profiling
+
+router = APIRouter()
+
+
+def require_profile_token(x_profile_token: Optional[str] = Header(default=None)):
+    """Profiles are only readable with the admin X-Profile-Token header"""
+    if not (settings.PROFILE_ADMIN_TOKEN and x_profile_token
+            and secrets.compare_digest(x_profile_token, settings.PROFILE_ADMIN_TOKEN)):
+        raise HTTPException(
+            status_code=403,
+            detail="Admin profile token required"
+        )
+
+
+@router.get("", dependencies=[Depends(require_profile_token)])
+async def list_profiles():
+    """
+    List saved request profiles, newest first
+    Each has the route, duration, hashed user id and row count
+    """
+    profiles = await run_in_threadpool(profiling.list_profiles)
+    
+    return {
+        "profiles": profiles,
+        "count": len(profiles)
+    }
+
+
+@router.get("/{name}", dependencies=[Depends(require_profile_token)])
+async def download_profile(name: str):
+    """
+    Download a profile as a pstats file
+    Load it with pstats.Stats(path) or a viewer like snakeviz
+    """
+    path = profiling.profile_path(name)
+    
+    if not path:
+        raise HTTPException(
+            status_code=404,
+            detail="Profile not found"
+        )
+    
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{name}.pstats")
@@ -1,44 +1,114 @@
+from typing import Dict, Optional
+from uuid import UUID
 from fastapi import APIRouter, HTTPException, Depends, Query
-from app.api.schemas import ReportRequest, ReportResponse, InsightsResponse
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from app.api.schemas import ReportRequest, ReportResponse, InsightsResponse, ReportJobResponse
 from app.services.report_generator import ReportGenerator
 from app.core.auth import get_current_user_id
-from app.core.database import db
+from app.core.config import settings
+from app.core.async_database import async_db
+from app.core import queries
+from app.core import serialization
+from app.core.serialization import FastJSONResponse
+from app.services.snapshots import snapshot_store
+from app.services.llm_client import LLMTimeoutError
+from app.services.insights_cache import insights_cache
+from app.services.report_jobs import report_jobs, JobQueueFullError
+from app.services.single_flight import single_flight
+from app.core.metrics import STAGE_SECONDS
+from app.core import profiling
 
 router = APIRouter()
 
-@router.post("/generate", response_model=ReportResponse)
-async def generate_report(
-    request: ReportRequest,
-    user_id: str = Depends(get_current_user_id)
-):
+
+async def load_transactions(user_id: str, request: ReportRequest):
     """
-    Generate a personalized financial report from user's transaction data
-    Protected endpoint - requires valid JWT token
+    Fetch what's needed to process a user's insights
+    Returns (transactions, snapshots); with snapshots enabled, every month
+    comes back as aggregates (saved ones for months that haven't changed), and
+    in SQL aggregate mode the whole range comes back as one set of aggregates.
+    Concurrent loads of the same range share one fetch.
     """
-    try:
-        # Fetch transactions from database
-        transactions = db.get_transactions_by_user(
-            user_id=user_id,
-            start_date=request.start_date,
-            end_date=request.end_date
-        )
+    return await single_flight.do(
+        ('transactions', user_id, request.start_date, request.end_date),
+        lambda: fetch_transactions(user_id, request)
+    )
+
+
+async def fetch_transactions(user_id: str, request: ReportRequest):
+    with STAGE_SECONDS.time(stage='fetch'):
+        return await _fetch_transactions(user_id, request)
+
+
+async def _fetch_transactions(user_id: str, request: ReportRequest):
+    if settings.INSIGHTS_SQL_AGGREGATES:
+        aggregates = await async_db.get_transaction_aggregates(user_id, request.start_date, request.end_date)
+        return [], [aggregates] if aggregates.num_transactions else []
+    
+    if settings.INSIGHTS_SNAPSHOTS:
+        return await snapshot_store.load(user_id, request.start_date, request.end_date)
+    
+    transactions = await async_db.get_transactions_by_user(
+        user_id=user_id,
+        start_date=request.start_date,
+        end_date=request.end_date
+    )
+    return transactions, []
+
+
+async def prepare_report(user_id: str, request: ReportRequest) -> ReportGenerator:
+    """
+    Load the user's data into a ReportGenerator
+    Raises 404 when there are no transactions in the range
+    """
+    # Fetch user profile
+    # user_profile = db.get_user_profile(user_id)
+    user_profile = {"user_id": user_id}
+    profiling.tag(user_id=user_id)
+    
+    if settings.DB_STREAM_TRANSACTIONS and not (settings.INSIGHTS_SNAPSHOTS or settings.INSIGHTS_SQL_AGGREGATES):
+        # Imported here so the sync pool is only opened when streaming is on
+        from app.core.database import db
         
-        if not transactions:
+        # Rows are processed straight off a server-side cursor, in a worker
+        # thread since both the cursor and the processing are blocking
+        transactions = db.iter_transactions_by_user(user_id, request.start_date, request.end_date)
+        generator = ReportGenerator(transactions, user_profile)
+        result = await run_in_threadpool(generator.generate)
+        
+        if result['metadata']['num_transactions'] == 0:
             raise HTTPException(
                 status_code=404, 
                 detail="No transactions found for this user"
             )
-        
-        # Fetch user profile
-        # user_profile = db.get_user_profile(user_id)
-        user_profile = {"user_id": user_id}
-        
-        # Generate report
-        generator = ReportGenerator(transactions, user_profile)
-        result = generator.generate_with_llm()
+        return generator
+    
+    # Fetch transactions from database
+    transactions, snapshots = await load_transactions(user_id, request)
+    
+    if not transactions and not snapshots:
+        raise HTTPException(
+            status_code=404, 
+            detail="No transactions found for this user"
+        )
+    
+    return ReportGenerator(transactions, user_profile, snapshots=snapshots)
 
-        # Save report to database
-        report_id = db.save_report(
+
+async def create_report(user_id: str, request: ReportRequest) -> Dict:
+    """
+    Generate a report and save it
+    Returns the ReportResponse fields; used inline by /generate and by report jobs
+    """
+    generator = await prepare_report(user_id, request)
+    
+    # Generate report
+    result = await generator.generate_with_llm_async(use_cache=not request.bypass_cache)
+
+    # Save report to database
+    with STAGE_SECONDS.time(stage='save_report'):
+        report_id = await async_db.save_report(
             user_id=user_id,
             report_text=result['ai_report'],
             processed_insights=result['processed_insights'],
@@ -46,11 +116,169 @@ async def generate_report(
             end_date=request.end_date,
             model_used=result['model_used']
         )
+    
+    return {
+        'ai_report': result['ai_report'],
+        'processed_insights': result['processed_insights'],
+        'metadata': result['metadata'],
+        'model_used': result['model_used'],
+        'report_id': report_id
+    }
+
+
+async def compute_insights(user_id: str, request: ReportRequest) -> Dict:
+    """
+    Processed insights and metadata for /insights, memoized per date range
+    """
+    use_cache = settings.INSIGHTS_CACHE_ENABLED and not request.bypass_cache
+    cache_key = (user_id, request.start_date, request.end_date)
+    
+    # Unchanged transactions since the last call: serve the memoized insights
+    if use_cache:
+        watermark = await async_db.get_transactions_watermark(user_id, request.start_date, request.end_date)
+        cached = insights_cache.get(cache_key, watermark)
+        if cached is not None:
+            return cached
+    
+    generator = await prepare_report(user_id, request)
+    
+    # Generate insights
+    result = await generator.generate_async()
+    
+    response = {
+        'processed_insights': result['processed_insights'],
+        'metadata': result['metadata']
+    }
+    if use_cache:
+        insights_cache.set(cache_key, watermark, response)
+    
+    return response
+
+
+def sse_event(event: str, data) -> bytes:
+    """
+    Format one Server-Sent Event
+    The insights event reuses processed_insights' stored encoding (a SerializedDict)
+    """
+    return b"event: " + event.encode() + b"\ndata: " + serialization.dumps(data) + b"\n\n"
+
+
+@router.post("/generate", response_model=ReportResponse, response_class=FastJSONResponse, deprecated=True)
+async def generate_report(
+    request: ReportRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Generate a personalized financial report from user's transaction data
+    Deprecated: generates inline, so the request lasts as long as the LLM
+    call. Use POST /jobs and poll GET /jobs/{job_id} instead; kept
+    synchronous for existing API clients.
+    Protected endpoint - requires valid JWT token
+    """
+    try:
+        # A double-clicked Generate shares one report instead of making two
+        result = await single_flight.do(
+            ('report', user_id, request.start_date, request.end_date, request.bypass_cache),
+            lambda: create_report(user_id, request)
+        )
         
-        # Add report_id to response
-        result['report_id'] = report_id
+        # Built by create_report, so it's returned as-is instead of re-validated
+        return FastJSONResponse(result)
+    
+    except HTTPException:
+        raise
+    except LLMTimeoutError as e:
+        raise HTTPException(
+            status_code=504,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, 
+            detail=f"Error generating report: {str(e)}"
+        )
+
+
+@router.post("/jobs", status_code=202, response_model=ReportJobResponse)
+async def submit_report_job(
+    request: ReportRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Queue report generation in the background and return the job right away
+    Poll GET /jobs/{job_id} for the result; submitting the same date range
+    again while a job is still pending or running returns that job
+    Protected endpoint - requires valid JWT token
+    """
+    try:
+        job, deduplicated = await report_jobs.submit(
+            user_id,
+            request.start_date,
+            request.end_date,
+            lambda: create_report(user_id, request)
+        )
         
-        return ReportResponse(**result)
+        return ReportJobResponse(job_id=job['id'], status=job['status'], deduplicated=deduplicated)
+    
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error submitting report job: {str(e)}"
+        )
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(job_id: UUID, user_id: str = Depends(get_current_user_id)):
+    """
+    Get the status of a report job, with the report once it's done
+    Protected endpoint - requires valid JWT token
+    """
+    try:
+        job = await async_db.get_report_job(user_id, str(job_id))
+        
+        if not job:
+            raise HTTPException(
+                status_code=404,
+                detail="Job not found"
+            )
+        
+        return ReportJobResponse(
+            job_id=job['id'],
+            status=job['status'],
+            result=ReportResponse(**job['result']) if job['result'] else None,
+            error=job['error']
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error fetching report job: {str(e)}"
+        )
+
+
+@router.post("/generate/stream")
+async def generate_report_stream(
+    request: ReportRequest,
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Generate a report and stream it as Server-Sent Events
+    Sends an 'insights' event as soon as the data is processed, 'token' events
+    while the report is written, then 'done' with the saved report_id
+    (or 'error' if generation fails part way)
+    Protected endpoint - requires valid JWT token
+    """
+    try:
+        generator = await prepare_report(user_id, request)
+        await generator.generate_async()
+        result, chunks = generator.stream_with_llm(use_cache=not request.bypass_cache)
     
     except HTTPException:
         raise
@@ -59,25 +287,76 @@ async def generate_report(
             status_code=500, 
             detail=f"Error generating report: {str(e)}"
         )
+    
+    async def events():
+        yield sse_event('insights', {
+            'processed_insights': result['processed_insights'],
+            'metadata': result['metadata']
+        })
+        
+        report_text = []
+        try:
+            async for text in chunks:
+                report_text.append(text)
+                yield sse_event('token', {'text': text})
+            
+            # Save the complete report, same as /generate
+            report_id = await async_db.save_report(
+                user_id=user_id,
+                report_text=''.join(report_text),
+                processed_insights=result['processed_insights'],
+                start_date=request.start_date,
+                end_date=request.end_date,
+                model_used=result['model_used']
+            )
+            
+            yield sse_event('done', {'report_id': report_id, 'model_used': result['model_used']})
+        
+        except LLMTimeoutError as e:
+            yield sse_event('error', {'status_code': 504, 'detail': str(e)})
+        except Exception as e:
+            yield sse_event('error', {'status_code': 500, 'detail': f"Error generating report: {str(e)}"})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
-@router.get("/history")
+@router.get("/history", response_class=FastJSONResponse)
 async def get_report_history(
     user_id: str = Depends(get_current_user_id),
     limit: int = Query(default=10, ge=1, le=50),
-    offset: int = Query(default=0, ge=0)
+    cursor: Optional[str] = Query(default=None),
+    include_body: bool = Query(default=False)
 ):
     """
-    Get user's report history
+    Get user's report history, most recent first
+    Reports are summaries without report_text and processed_insights unless
+    include_body is set (fetch one with GET /history/{report_id}). Pass
+    next_cursor back as cursor for the following page; it's null on the last one.
     Protected endpoint - requires valid JWT token
     """
     try:
-        reports = db.get_user_reports(user_id, limit, offset)
+        try:
+            after = queries.decode_report_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(
+                status_code=400,
+                detail=str(e)
+            )
+        
+        reports, next_cursor = await async_db.get_user_reports(user_id, limit, after, include_body)
         
-        return {
+        return FastJSONResponse({
             "reports": reports,
-            "count": len(reports)
-        }
+            "count": len(reports),
+            "next_cursor": next_cursor
+        })
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -85,14 +364,14 @@ async def get_report_history(
         )
 
 
-@router.get("/history/{report_id}")
+@router.get("/history/{report_id}", response_class=FastJSONResponse)
 async def get_report_by_id(report_id: int, user_id: str = Depends(get_current_user_id),):
     """
     Get a specific report by ID
     Protected endpoint - requires valid JWT token
     """
     try:
-        report = db.get_report_by_id(user_id, report_id)
+        report = await async_db.get_report_by_id(user_id, report_id)
         
         if not report:
             raise HTTPException(
@@ -100,7 +379,7 @@ async def get_report_by_id(report_id: int, user_id: str = Depends(get_current_us
                 detail="Report not found"
             )
         
-        return report
+        return FastJSONResponse(report)
     
     except HTTPException:
         raise
@@ -118,7 +397,7 @@ async def delete_report(report_id: int, user_id: str = Depends(get_current_user_
     Protected endpoint - requires valid JWT token
     """
     try:
-        deleted = db.delete_report(user_id, report_id)
+        deleted = await async_db.delete_report(user_id, report_id)
         
         if not deleted:
             raise HTTPException(
@@ -138,7 +417,7 @@ async def delete_report(report_id: int, user_id: str = Depends(get_current_user_
 
 
 
-@router.post("/insights", response_model=InsightsResponse)
+@router.post("/insights", response_model=InsightsResponse, response_class=FastJSONResponse)
 async def generate_insights(
     request: ReportRequest,
     user_id: str = Depends(get_current_user_id)
@@ -148,31 +427,13 @@ async def generate_insights(
     Protected endpoint - requires valid JWT token
     """
     try:
-        # Fetch transactions from database
-        transactions = db.get_transactions_by_user(
-            user_id=user_id,
-            start_date=request.start_date,
-            end_date=request.end_date
+        # Identical requests in flight (e.g. a remounted page) share one computation
+        response = await single_flight.do(
+            ('insights', user_id, request.start_date, request.end_date, request.bypass_cache),
+            lambda: compute_insights(user_id, request)
         )
         
-        if not transactions:
-            raise HTTPException(
-                status_code=404, 
-                detail="No transactions found for this user"
-            )
-        
-        # Fetch user profile
-        # user_profile = db.get_user_profile(user_id)
-        user_profile = {"user_id": user_id}
-        
-        # Generate insights
-        generator = ReportGenerator(transactions, user_profile)
-        result = generator.generate()
-        
-        return InsightsResponse(
-            processed_insights=result['processed_insights'],
-            metadata=result['metadata']
-        )
+        return FastJSONResponse(response)
     
     except HTTPException:
         raise
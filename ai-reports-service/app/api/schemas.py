@@ -1,11 +1,20 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+from uuid import UUID
 
 
 class ReportRequest(BaseModel):
     """Request model for generating report"""
     start_date: Optional[str] = None  # Optional date filter YYYY-MM-DD
     end_date: Optional[str] = None    # Optional date filter YYYY-MM-DD
+    bypass_cache: bool = False        # Recompute even if a cached report/insights exist
+
+
+class InsightsBatchRequest(BaseModel):
+    """Request model for insights of many users at once"""
+    user_ids: List[UUID]
+    start_date: Optional[str] = None  # Optional date filter YYYY-MM-DD
+    end_date: Optional[str] = None    # Optional date filter YYYY-MM-DD
 
 
 class ReportResponse(BaseModel):
@@ -20,4 +29,13 @@ class ReportResponse(BaseModel):
 class InsightsResponse(BaseModel):
     """Response model for insights only"""
     processed_insights: dict
-    metadata: dict
\ No newline at end of file
+    metadata: dict
+
+
+class ReportJobResponse(BaseModel):
+    """Response model for a background report job"""
+    job_id: str
+    status: str                              # pending, running, done or failed
+    deduplicated: bool = False               # An identical job was already active
+    result: Optional[ReportResponse] = None  # Set once status is done
+    error: Optional[str] = None              # Set once status is failed
@@ -0,0 +1,478 @@
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from contextlib import asynccontextmanager, AsyncExitStack
+import time
+import uuid
+from datetime import date, datetime
+from app.core.config import settings
+from app.core import queries, profiling
+from app.core.metrics import timed_query, DB_POOL_CONNECTIONS, DB_POOL_WAIT_SECONDS, DB_POOL_CHECKOUTS
+from app.core.records import Transaction
+from app.services.aggregates import TransactionAggregates
+
+
+class ManagedAsyncConnection(psycopg.AsyncConnection):
+    """psycopg connection that tracks when it was last used"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_used = time.monotonic()
+
+
+# Hot queries run on every connection when the pool is warmed up, so psycopg
+# has them prepared; the values match no rows
+_NO_USER = '00000000-0000-0000-0000-000000000000'
+WARM_UP_QUERIES = (
+    queries.build_transactions_query(_NO_USER),
+    queries.build_transactions_query(_NO_USER, '1970-01-01', '1970-01-01'),
+    queries.build_user_reports_query(_NO_USER, 10),
+    queries.build_user_reports_query(_NO_USER, 10, ('1970-01-01T00:00:00+00:00', 0)),
+    (queries.REPORT_BY_ID_SQL, (0, _NO_USER)),
+)
+
+
+class AsyncDatabaseManager:
+    """
+    asyncio-native counterpart of DatabaseManager
+    Same queries and return values, but every method is awaitable and runs on
+    an async connection pool, so a slow query never blocks the event loop.
+    """
+
+    def __init__(self):
+        database_url = settings.DATABASE_URL
+
+        if not database_url:
+            raise ValueError("DATABASE_URL environment variable is not set!")
+
+        # The pool is opened on application startup, inside the event loop.
+        # psycopg prepares a query server-side once a connection has run it
+        # prepare_threshold times; 0 prepares on first use, None never does.
+        # Off by default: Supabase's transaction-mode pooler hands each
+        # transaction whichever server connection is free, so a statement
+        # prepared on one isn't there on the next.
+        # Connections past DB_CONN_MAX_LIFETIME_SECONDS are recycled, and ones
+        # idle longer than DB_CONN_CHECK_IDLE_SECONDS are checked on checkout
+        self.pool = AsyncConnectionPool(
+            conninfo=database_url,
+            connection_class=ManagedAsyncConnection,
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            max_lifetime=settings.DB_CONN_MAX_LIFETIME_SECONDS,
+            timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            check=self._check_connection,
+            kwargs={'prepare_threshold': 0 if settings.DB_PREPARE_STATEMENTS else None},
+            open=False
+        )
+        DB_POOL_CONNECTIONS.set_function(self._connections_in_use, pool='async', state='in_use')
+        DB_POOL_CONNECTIONS.set_function(lambda: self.pool.max_size, pool='async', state='max')
+        DB_POOL_CONNECTIONS.set_function(lambda: self.pool.get_stats().get('requests_waiting', 0), pool='async', state='waiting')
+
+    async def open(self):
+        """Open the connection pool"""
+        await self.pool.open()
+        print("✅ Connected to Supabase PostgreSQL (async pool)")
+
+    async def warm_up(self):
+        """
+        Wait for the pool's initial connections and prepare the hot queries on each
+        Run at startup so the first requests find connections open and their
+        statements already planned
+        """
+        await self.pool.wait(timeout=settings.DB_POOL_TIMEOUT_SECONDS)
+        if not settings.DB_PREPARE_STATEMENTS:
+            return
+
+        # Hold them all at once, so every connection gets its turn
+        async with AsyncExitStack() as stack:
+            conns = [
+                await stack.enter_async_context(self.get_connection())
+                for _ in range(settings.DB_POOL_MIN_SIZE)
+            ]
+            for conn in conns:
+                for query, params in WARM_UP_QUERIES:
+                    try:
+                        await conn.execute(query, params)
+                        await conn.commit()
+                    except psycopg.Error as e:
+                        # e.g. a table that doesn't exist yet; it's prepared on first use instead
+                        await conn.rollback()
+                        print(f"⚠️ Could not prepare statement: {e}")
+
+        print(f"🔥 Warmed up {len(conns)} async database connections")
+
+    @staticmethod
+    async def _check_connection(conn: ManagedAsyncConnection):
+        """Health check on checkout for connections idle a while (raises if it's dead)"""
+        if time.monotonic() - conn.last_used > settings.DB_CONN_CHECK_IDLE_SECONDS:
+            await AsyncConnectionPool.check_connection(conn)
+
+    def _connections_in_use(self) -> int:
+        if self.pool.closed:
+            return 0
+        stats = self.pool.get_stats()
+        return stats.get('pool_size', 0) - stats.get('pool_available', 0)
+
+    @asynccontextmanager
+    async def get_connection(self):
+        """Context manager for database connections (commits on success, rolls back on error)"""
+        async with AsyncExitStack() as stack:
+            start = time.perf_counter()
+            try:
+                conn = await stack.enter_async_context(self.pool.connection())
+            except PoolTimeout:
+                DB_POOL_CHECKOUTS.inc(pool='async', outcome='timeout')
+                raise
+            finally:
+                DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start, pool='async')
+            DB_POOL_CHECKOUTS.inc(pool='async', outcome='ok')
+            try:
+                yield conn
+            finally:
+                conn.last_used = time.monotonic()
+
+    @timed_query('async')
+    async def get_transactions_by_user(
+        self,
+        user_id: str,  # UUID as string
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        months: Optional[List[date]] = None
+    ) -> List[Transaction]:
+        """
+        Fetch all transactions for a user, optionally filtered by date range
+        and/or restricted to the given calendar months (first day of each month)
+        Converts category_id to category name
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            query, params = queries.build_transactions_query(user_id, start_date, end_date, months)
+            await cursor.execute(query, params)
+            rows = await cursor.fetchall()
+
+            with profiling.section():
+                return [queries.transaction_from_row(row) for row in rows]
+
+    async def iter_transaction_rows_by_users(
+        self,
+        user_ids: List[str],  # UUIDs as strings
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        itersize: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Tuple]]:
+        """
+        Stream several users' transactions in one query, grouped by user
+        Yields (user_id, row) with row in TRANSACTION_COLUMNS order (convert
+        it with queries.transaction_from_row). Reads through a server-side
+        cursor, itersize rows per round trip.
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(name=f"user_transactions_{uuid.uuid4().hex}")
+            cursor.itersize = itersize or settings.DB_STREAM_ITERSIZE
+
+            query, params = queries.build_users_transactions_query(user_ids, start_date, end_date)
+            try:
+                await cursor.execute(query, params)
+
+                async for row in cursor:
+                    yield str(row[0]), row[1:]
+            finally:
+                # Also runs when the consumer stops early (the generator is
+                # closed): the server-side cursor is closed here, and the
+                # connection's context rolls back the unfinished transaction
+                await cursor.close()
+
+    @timed_query('async')
+    async def get_transaction_aggregates(
+        self,
+        user_id: str,  # UUID as string
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> TransactionAggregates:
+        """
+        Aggregate a user's transactions in PostgreSQL (SQL aggregate insights mode)
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            query, params = queries.build_aggregates_query(user_id, start_date, end_date)
+            await cursor.execute(query, params)
+
+            return TransactionAggregates.from_grouped_rows(
+                queries.aggregate_row_from_row(row) for row in await cursor.fetchall()
+            )
+
+    @timed_query('async')
+    async def get_monthly_watermarks(
+        self,
+        user_id: str,  # UUID as string
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Dict[date, Dict]:
+        """
+        Transaction count and latest update time per calendar month
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            query, params = queries.build_watermarks_query(user_id, start_date, end_date)
+            await cursor.execute(query, params)
+
+            return {row['month']: row for row in await cursor.fetchall()}
+
+    @timed_query('async')
+    async def get_transactions_watermark(
+        self,
+        user_id: str,  # UUID as string
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Tuple[int, Optional[datetime]]:
+        """
+        (count, latest updated_at) of the transactions in a date range
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            query, params = queries.build_range_watermark_query(user_id, start_date, end_date)
+            await cursor.execute(query, params)
+
+            row = await cursor.fetchone()
+            return row['num_transactions'], row['last_updated_at']
+
+    @timed_query('async')
+    async def get_insight_snapshots(self, user_id: str, months: List[date]) -> Dict[date, Dict]:
+        """
+        Fetch saved monthly aggregate snapshots that are still valid
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            await cursor.execute(queries.INSIGHT_SNAPSHOTS_SQL, queries.insight_snapshots_params(user_id, months))
+
+            return queries.snapshots_from_rows(await cursor.fetchall())
+
+    @timed_query('async')
+    async def save_insight_snapshots(self, user_id: str, snapshots: List[Dict]):
+        """
+        Insert or replace monthly aggregate snapshots
+        """
+        if not snapshots:
+            return
+
+        async with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            await cursor.executemany(
+                queries.SAVE_INSIGHT_SNAPSHOT_SQL,
+                queries.save_insight_snapshot_params(user_id, snapshots)
+            )
+
+    @timed_query('async')
+    async def get_cached_llm_response(self, prompt_hash: str, ttl: float) -> Optional[Dict]:
+        """
+        Fetch a cached LLM response younger than ttl seconds
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            await cursor.execute(queries.CACHED_LLM_RESPONSE_SQL, (prompt_hash, ttl))
+
+            return await cursor.fetchone()
+
+    @timed_query('async')
+    async def save_cached_llm_response(
+        self,
+        prompt_hash: str,
+        model_used: str,
+        response: str,
+        ttl: float,
+        max_entries: int
+    ):
+        """
+        Store an LLM response, then evict expired entries and the oldest ones past max_entries
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            await cursor.execute(queries.SAVE_CACHED_LLM_RESPONSE_SQL, (prompt_hash, model_used, response))
+            await cursor.execute(queries.PRUNE_LLM_CACHE_SQL, (ttl, max_entries))
+
+    @timed_query('async')
+    async def get_user_profile(self, user_id: str) -> Optional[Dict]:
+        """
+        Fetch user profile information
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            await cursor.execute(queries.USER_PROFILE_SQL, (user_id,))
+
+            row = await cursor.fetchone()
+
+            if row:
+                return queries.profile_from_row(row)
+
+            return None
+
+    @timed_query('async')
+    async def save_report(
+        self,
+        user_id: str,  # UUID as string
+        report_text: str,
+        processed_insights: Dict,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        model_used: str = "gemini-2.5-flash"
+    ) -> int:
+        """
+        Save an AI report to the database
+        Returns the report ID
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            await cursor.execute(queries.SAVE_REPORT_SQL, queries.save_report_params(
+                user_id, report_text, processed_insights, start_date, end_date, model_used
+            ))
+
+            report_id = (await cursor.fetchone())[0]
+            return report_id
+
+    @timed_query('async')
+    async def get_user_reports(
+        self,
+        user_id: str,  # UUID as string
+        limit: int = 10,
+        after: Optional[Tuple[str, int]] = None,
+        include_body: bool = False
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Fetch a page of AI reports for a user, ordered by most recent first
+        after is a decoded cursor from the previous page. Reports are summaries
+        unless include_body; returns (reports, next page cursor or None)
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            query, params = queries.build_user_reports_query(user_id, limit, after, include_body)
+            await cursor.execute(query, params)
+
+            return queries.reports_page_from_rows(await cursor.fetchall(), limit)
+
+    @timed_query('async')
+    async def get_report_by_id(self, user_id: str, report_id: int) -> Optional[Dict]:
+        """
+        Fetch a specific report by ID (with user_id check for security)
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            await cursor.execute(queries.REPORT_BY_ID_SQL, (report_id, user_id))
+
+            row = await cursor.fetchone()
+
+            if row:
+                return queries.report_from_row(row)
+
+            return None
+
+    @timed_query('async')
+    async def delete_report(self, user_id: str, report_id: int) -> bool:
+        """
+        Delete a report (with user_id check for security)
+        Returns True if deleted, False if not found
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            await cursor.execute(queries.DELETE_REPORT_SQL, (report_id, user_id))
+
+            return cursor.rowcount > 0
+
+    @timed_query('async')
+    async def create_report_job(
+        self,
+        user_id: str,  # UUID as string
+        start_date: Optional[str],
+        end_date: Optional[str]
+    ) -> Dict:
+        """
+        Record a new pending report job
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            await cursor.execute(queries.CREATE_REPORT_JOB_SQL, (user_id, start_date, end_date))
+
+            return queries.report_job_from_row(await cursor.fetchone())
+
+    @timed_query('async')
+    async def get_active_report_job(
+        self,
+        user_id: str,  # UUID as string
+        start_date: Optional[str],
+        end_date: Optional[str],
+        stale_after: float
+    ) -> Optional[Dict]:
+        """
+        Pending or running job for the same user and date range, if any
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            await cursor.execute(queries.ACTIVE_REPORT_JOB_SQL, (user_id, start_date, end_date, stale_after))
+
+            row = await cursor.fetchone()
+
+            if row:
+                return queries.report_job_from_row(row)
+
+            return None
+
+    @timed_query('async')
+    async def update_report_job(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict] = None,
+        error: Optional[str] = None
+    ):
+        """
+        Set a job's status, and its result or error once finished
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            await cursor.execute(
+                queries.UPDATE_REPORT_JOB_SQL,
+                queries.update_report_job_params(job_id, status, result, error)
+            )
+
+    @timed_query('async')
+    async def get_report_job(self, user_id: str, job_id: str) -> Optional[Dict]:
+        """
+        Fetch a job by ID (with user_id check for security)
+        """
+        async with self.get_connection() as conn:
+            cursor = conn.cursor(row_factory=dict_row)
+
+            await cursor.execute(queries.REPORT_JOB_BY_ID_SQL, (job_id, user_id))
+
+            row = await cursor.fetchone()
+
+            if row:
+                return queries.report_job_from_row(row)
+
+            return None
+
+    async def close(self):
+        """Close all connections in the pool"""
+        if self.pool:
+            await self.pool.close()
+            print("🔒 Async database connection pool closed")
+
+
+# Global async database instance, opened on application startup
+async_db = AsyncDatabaseManager()
@@ -0,0 +1,62 @@
+# Compressed storage format for large report columns (see migrations/005).
+# A stored value is one version byte naming the codec, then the compressed
+# data, so rows written with different codecs can be read side by side.
+import zlib
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for REPORT_COMPRESSION=zstd
+    zstandard = None
+
+
+# Version byte -> codec; never reuse a number once rows have been written with it
+ZLIB_V1 = 1
+ZSTD_V1 = 2
+
+CODECS = {'zlib': ZLIB_V1, 'zstd': ZSTD_V1}
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+
+def check_codec(codec: str):
+    """Raise ValueError if codec can't be used for writing"""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression codec: {codec}")
+    if codec == 'zstd' and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package")
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    """Versioned compressed blob for data"""
+    check_codec(codec)
+    if codec == 'zstd':
+        body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    else:
+        body = zlib.compress(data, ZLIB_LEVEL)
+    return bytes((CODECS[codec],)) + body
+
+
+def decompress(blob) -> bytes:
+    """Original data of a blob written by compress (bytes or memoryview)"""
+    blob = memoryview(blob)
+    if not blob:
+        raise ValueError("Empty compressed value")
+
+    version = blob[0]
+    if version == ZLIB_V1:
+        return zlib.decompress(blob[1:])
+    if version == ZSTD_V1:
+        if zstandard is None:
+            raise ValueError("zstd-compressed value, but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob[1:])
+    raise ValueError(f"Unknown compression version: {version}")
+
+
+def compress_text(text: Optional[str], codec: str) -> Optional[bytes]:
+    return compress(text.encode(), codec) if text is not None else None
+
+
+def decompress_text(blob) -> Optional[str]:
+    return decompress(blob).decode() if blob is not None else None
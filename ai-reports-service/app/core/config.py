@@ -18,6 +18,14 @@ class Settings(BaseSettings):
 
     # Database settings (Supabase PostgreSQL)
     DATABASE_URL: str = ""
+    DB_POOL_MIN_SIZE: int = 5  # Connections opened at startup and kept warm
+    DB_POOL_MAX_SIZE: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30  # Wait this long for a free connection before failing
+    DB_PREPARE_STATEMENTS: bool = False  # Prepare hot queries on first use and at startup (only with a direct or session-mode connection)
+    DB_CONN_MAX_LIFETIME_SECONDS: float = 1800  # Connections older than this are recycled
+    DB_CONN_CHECK_IDLE_SECONDS: float = 30  # Connections idle longer than this are health-checked on checkout
+    DB_STREAM_TRANSACTIONS: bool = False  # Process transactions from a server-side cursor
+    DB_STREAM_ITERSIZE: int = 2000  # Rows per round trip when streaming
 
     # Parse database connection info from DATABASE_URL
     @property
@@ -91,6 +99,40 @@ class Settings(BaseSettings):
     # AI settings
     GEMINI_API_KEY: str = ""
     GEMINI_MODEL: str = "gemini-1.5-flash"
+    LLM_MAX_CONCURRENCY: int = 4  # Generations running at once across all requests
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_CACHE_ENABLED: bool = True  # Reuse reports for identical prompts (migrations/002)
+    LLM_CACHE_MAX_ENTRIES: int = 256  # In-process LRU
+    LLM_CACHE_PERSISTENT_MAX_ENTRIES: int = 10000  # ai_llm_cache table
+    LLM_CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+
+    # Background report jobs (migrations/003)
+    REPORT_JOB_WORKERS: int = 4
+    REPORT_JOB_MAX_PENDING: int = 100
+    REPORT_JOB_STALE_SECONDS: float = 600  # Active jobs older than this no longer de-duplicate
+
+    # Report storage
+    REPORT_COMPRESSION: str = "none"  # "none", "zlib" or "zstd" for report bodies (migrations/005)
+
+    # Insights settings
+    INSIGHTS_SNAPSHOTS: bool = False  # Reuse monthly aggregate snapshots (migrations/001)
+    INSIGHTS_SQL_AGGREGATES: bool = False  # Aggregate in PostgreSQL instead of fetching rows
+    INSIGHTS_CACHE_ENABLED: bool = True  # Memoize /insights until the transactions change
+    INSIGHTS_CACHE_MAX_ENTRIES: int = 512
+    INSIGHTS_EXECUTION: str = "inline"  # "inline", or "process" to compute large inputs in worker processes
+    INSIGHTS_PROCESS_MIN_TRANSACTIONS: int = 20000  # Smaller inputs stay inline, where IPC costs more than it saves
+    INSIGHTS_WORKERS: int = 0  # Worker processes for insights computation (0: one per CPU)
+    INSIGHTS_BATCH_MAX_USERS: int = 1000  # Users per /admin/insights/batch request
+
+    # Admin API
+    ADMIN_API_TOKEN: str = ""  # X-Admin-Token value for admin endpoints (disabled when empty)
+
+    # Profiling (off unless a token or sample rate is set)
+    PROFILE_ADMIN_TOKEN: str = ""  # X-Profile-Token value that profiles a request and reads profiles
+    PROFILE_SAMPLE_RATE: float = 0.0  # Fraction of requests profiled to catch slow ones
+    PROFILE_SLOW_REQUEST_SECONDS: float = 5.0  # Sampled profiles are kept above this latency
+    PROFILE_DIR: str = "profiles"
+    PROFILE_MAX_FILES: int = 200
 
     # API settings
     API_HOST: str = "0.0.0.0"
@@ -1,10 +1,24 @@
-from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
-from typing import List, Dict, Optional
-from contextlib import contextmanager
-import json
+import psycopg
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool, PoolTimeout
+from typing import List, Optional, Iterator
+from contextlib import contextmanager, ExitStack
+from datetime import date
+import time
+import uuid
 from app.core.config import settings
-from app.core.categories import get_category_name
+from app.core import queries
+from app.core.metrics import timed_query, DB_POOL_CONNECTIONS, DB_POOL_WAIT_SECONDS, DB_POOL_CHECKOUTS
+from app.core.records import Transaction
+from app.services.aggregates import TransactionAggregates
+
+
+class ManagedConnection(psycopg.Connection):
+    """psycopg connection that tracks when it was last used"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_used = time.monotonic()
 
 
 class DatabaseManager:
@@ -17,238 +31,138 @@ class DatabaseManager:
         if not database_url:
             raise ValueError("DATABASE_URL environment variable is not set!")
 
-        # Initialize connection pool with connection string
-        self.pool = SimpleConnectionPool(
-            minconn=1,
-            maxconn=20,
-            dsn=database_url  # Use connection string directly
+        # Initialize connection pool with connection string; min_size
+        # connections are opened in the background and kept open between
+        # requests. Handlers share it across threadpool threads; when every
+        # connection is checked out, callers queue for up to DB_POOL_TIMEOUT_SECONDS.
+        # Connections past DB_CONN_MAX_LIFETIME_SECONDS are recycled, and ones
+        # idle longer than DB_CONN_CHECK_IDLE_SECONDS are checked on checkout
+        self.pool = ConnectionPool(
+            conninfo=database_url,  # Use connection string directly
+            connection_class=ManagedConnection,
+            min_size=settings.DB_POOL_MIN_SIZE,
+            max_size=settings.DB_POOL_MAX_SIZE,
+            max_lifetime=settings.DB_CONN_MAX_LIFETIME_SECONDS,
+            timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            check=self._check_connection,
+            kwargs={'prepare_threshold': None},
+            open=True
         )
+        DB_POOL_CONNECTIONS.set_function(self._connections_in_use, pool='sync', state='in_use')
+        DB_POOL_CONNECTIONS.set_function(lambda: self.pool.max_size, pool='sync', state='max')
+        DB_POOL_CONNECTIONS.set_function(lambda: self.pool.get_stats().get('requests_waiting', 0), pool='sync', state='waiting')
         print("✅ Connected to Supabase PostgreSQL")
     
+    @staticmethod
+    def _check_connection(conn: ManagedConnection):
+        """Health check on checkout for connections idle a while (raises if it's dead)"""
+        if time.monotonic() - conn.last_used > settings.DB_CONN_CHECK_IDLE_SECONDS:
+            ConnectionPool.check_connection(conn)
+    
+    def _connections_in_use(self) -> int:
+        if self.pool.closed:
+            return 0
+        stats = self.pool.get_stats()
+        return stats.get('pool_size', 0) - stats.get('pool_available', 0)
+    
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = self.pool.getconn()
-        try:
-            yield conn
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            self.pool.putconn(conn)
+        """Context manager for database connections (commits on success, rolls back on error)"""
+        with ExitStack() as stack:
+            start = time.perf_counter()
+            try:
+                conn = stack.enter_context(self.pool.connection())
+            except PoolTimeout:
+                DB_POOL_CHECKOUTS.inc(pool='sync', outcome='timeout')
+                raise
+            finally:
+                DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - start, pool='sync')
+            DB_POOL_CHECKOUTS.inc(pool='sync', outcome='ok')
+            try:
+                yield conn
+            finally:
+                conn.last_used = time.monotonic()
     
+    @timed_query('sync')
     def get_transactions_by_user(
         self, 
         user_id: str,  # UUID as string
         start_date: Optional[str] = None,
-        end_date: Optional[str] = None
-    ) -> List[Dict]:
+        end_date: Optional[str] = None,
+        months: Optional[List[date]] = None
+    ) -> List[Transaction]:
         """
         Fetch all transactions for a user, optionally filtered by date range
+        and/or restricted to the given calendar months (first day of each month)
         Converts category_id to category name
         """
         with self.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = """
-                SELECT id, user_id, type, amount, category_id, description, 
-                       date, created_at, updated_at
-                FROM transactions
-                WHERE user_id = %s
-            """
-            params = [user_id]
-            
-            if start_date:
-                query += " AND date >= %s"
-                params.append(start_date)
-            
-            if end_date:
-                query += " AND date <= %s"
-                params.append(end_date)
-            
-            query += " ORDER BY date DESC"
+            cursor = conn.cursor()
             
+            query, params = queries.build_transactions_query(user_id, start_date, end_date, months)
             cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            # Convert RealDictRow to dict and map category names
-            transactions = []
-            for row in rows:
-                transaction = dict(row)
-                # Convert UUID to string
-                transaction['user_id'] = str(transaction['user_id'])
-                # Convert category_id to name
-                transaction['category_id'] = get_category_name(int(transaction['category_id']))
-                transactions.append(transaction)
             
-            return transactions
+            return [queries.transaction_from_row(row) for row in cursor.fetchall()]
     
-    def get_user_profile(self, user_id: str) -> Optional[Dict]:
-        """
-        Fetch user profile information
-        Note: You may need to create a user_profiles table if it doesn't exist
-        """
-        with self.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cursor.execute("""
-                SELECT user_id, name, financial_goals, risk_tolerance
-                FROM user_profiles
-                WHERE user_id = %s
-            """, (user_id,))
-            
-            row = cursor.fetchone()
-            
-            if row:
-                profile = dict(row)
-                profile['user_id'] = str(profile['user_id'])
-                # Parse financial_goals if stored as JSON
-                if profile.get('financial_goals'):
-                    if isinstance(profile['financial_goals'], str):
-                        try:
-                            profile['financial_goals'] = json.loads(profile['financial_goals'])
-                        except:
-                            profile['financial_goals'] = []
-                return profile
-            
-            return None
-
-    def save_report(
+    def iter_transactions_by_user(
         self,
         user_id: str,  # UUID as string
-        report_text: str,
-        processed_insights: Dict,
-        start_date: Optional[str],
-        end_date: Optional[str],
-        model_used: str = "gemini-2.5-flash"
-    ) -> int:
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        months: Optional[List[date]] = None,
+        itersize: Optional[int] = None
+    ) -> Iterator[Transaction]:
         """
-        Save an AI report to the database
-        Returns the report ID
+        Streaming version of get_transactions_by_user
+        Reads through a named server-side cursor, itersize rows per round
+        trip, so only one batch is held in memory however long the history is.
+        The connection stays checked out until the iterator is exhausted or closed.
         """
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Extract summary data
-            summary = processed_insights.get('summary', {})
-            time_period = processed_insights.get('time_period', {})
-            
-            cursor.execute("""
-                INSERT INTO ai_reports (
-                    user_id, report_text, processed_insights,
-                    start_date, end_date, num_transactions,
-                    savings_rate, total_income, total_expenses, model_used
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """, (
-                user_id,
-                report_text,
-                json.dumps(processed_insights),  # PostgreSQL handles JSON automatically
-                start_date,
-                end_date,
-                time_period.get('num_transactions', 0),
-                summary.get('savings_rate'),
-                summary.get('total_income'),
-                summary.get('total_expenses'),
-                model_used
-            ))
-            
-            report_id = cursor.fetchone()[0]
-            return report_id
+            cursor = conn.cursor(name=f"transactions_{uuid.uuid4().hex}")
+            cursor.itersize = itersize or settings.DB_STREAM_ITERSIZE
+            
+            query, params = queries.build_transactions_query(user_id, start_date, end_date, months)
+            try:
+                cursor.execute(query, params)
+                
+                for row in cursor:
+                    yield queries.transaction_from_row(row)
+            finally:
+                # Also runs when the consumer stops early (the generator is
+                # closed): the server-side cursor is closed here, and the
+                # connection's context rolls back the unfinished transaction
+                cursor.close()
     
-    def get_user_reports(
+    @timed_query('sync')
+    def get_transaction_aggregates(
         self,
         user_id: str,  # UUID as string
-        limit: int = 10,
-        offset: int = 0
-    ) -> List[Dict]:
-        """
-        Fetch AI reports for a user, ordered by most recent first
-        """
-        with self.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cursor.execute("""
-                SELECT 
-                    id, user_id, report_text, processed_insights,
-                    start_date, end_date, num_transactions,
-                    savings_rate, total_income, total_expenses,
-                    model_used, created_at
-                FROM ai_reports
-                WHERE user_id = %s
-                ORDER BY created_at DESC
-                LIMIT %s OFFSET %s
-            """, (user_id, limit, offset))
-            
-            rows = cursor.fetchall()
-            
-            reports = []
-            for row in rows:
-                report = dict(row)
-                report['user_id'] = str(report['user_id'])
-                # Parse JSON insights (PostgreSQL may return as dict already)
-                if isinstance(report['processed_insights'], str):
-                    try:
-                        report['processed_insights'] = json.loads(report['processed_insights'])
-                    except:
-                        report['processed_insights'] = {}
-                reports.append(report)
-            
-            return reports
-    
-    def get_report_by_id(self, user_id: str, report_id: int) -> Optional[Dict]:
-        """
-        Fetch a specific report by ID (with user_id check for security)
-        """
-        with self.get_connection() as conn:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cursor.execute("""
-                SELECT 
-                    id, user_id, report_text, processed_insights,
-                    start_date, end_date, num_transactions,
-                    savings_rate, total_income, total_expenses,
-                    model_used, created_at
-                FROM ai_reports
-                WHERE id = %s AND user_id = %s
-            """, (report_id, user_id))
-            
-            row = cursor.fetchone()
-            
-            if row:
-                report = dict(row)
-                report['user_id'] = str(report['user_id'])
-                if isinstance(report['processed_insights'], str):
-                    try:
-                        report['processed_insights'] = json.loads(report['processed_insights'])
-                    except:
-                        report['processed_insights'] = {}
-                return report
-            
-            return None
-    
-    def delete_report(self, user_id: str, report_id: int) -> bool:
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> TransactionAggregates:
         """
-        Delete a report (with user_id check for security)
-        Returns True if deleted, False if not found
+        Aggregate a user's transactions in PostgreSQL instead of in Python
+        One round trip returns sums, counts, maxima and sums of squares grouped
+        by category and by day, plus the largest-amount candidates; the result
+        equals FinancialDataProcessor's aggregates over the same rows
         """
         with self.get_connection() as conn:
-            cursor = conn.cursor()
+            cursor = conn.cursor(row_factory=dict_row)
             
-            cursor.execute("""
-                DELETE FROM ai_reports
-                WHERE id = %s AND user_id = %s
-            """, (report_id, user_id))
+            query, params = queries.build_aggregates_query(user_id, start_date, end_date)
+            cursor.execute(query, params)
             
-            return cursor.rowcount > 0
+            return TransactionAggregates.from_grouped_rows(
+                queries.aggregate_row_from_row(row) for row in cursor.fetchall()
+            )
     
     def close(self):
         """Close all connections in the pool"""
         if self.pool:
-            self.pool.closeall()
+            self.pool.close()
             print("🔒 Database connection pool closed")
 
 
 # Global database instance
-db = DatabaseManager()
\ No newline at end of file
+db = DatabaseManager()
@@ -0,0 +1,182 @@
+import asyncio
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# Latency buckets in seconds, up to the LLM timeout range
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class Histogram:
+    """Latency histogram with labels, rendered in Prometheus text format"""
+
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, List] = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+
+        for key, values in sorted(series.items()):
+            labels = dict(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': repr(float(bound))})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {values[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(dict(key))} {value}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose values are read from callbacks when rendered"""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def set_function(self, fn: Callable[[], float], **labels):
+        self._functions[tuple(sorted(labels.items()))] = fn
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, fn in sorted(self._functions.items()):
+            try:
+                value = fn()
+            except Exception:
+                # e.g. a pool that's closed or not opened yet
+                continue
+            lines.append(f"{self.name}{_format_labels(dict(key))} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics served on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator observing each call's duration (sync or async functions)"""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def timed_query(driver: str):
+    """Decorator recording a database manager method in DB_QUERY_SECONDS"""
+    def decorator(fn):
+        return timed(DB_QUERY_SECONDS, driver=driver, method=fn.__name__)(fn)
+    return decorator
+
+
+# Global registry and the service's metrics
+registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    'ai_reports_http_request_duration_seconds', 'HTTP request latency by route'
+))
+STAGE_SECONDS = registry.register(Histogram(
+    'ai_reports_stage_duration_seconds', 'Report pipeline stage latency (fetch, process, build_prompt, llm, save_report)'
+))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    'ai_reports_db_query_duration_seconds', 'Database manager method latency'
+))
+DB_POOL_CONNECTIONS = registry.register(Gauge(
+    'ai_reports_db_pool_connections', 'Database pool connections by state (in_use, max, waiting)'
+))
+DB_POOL_WAIT_SECONDS = registry.register(Histogram(
+    'ai_reports_db_pool_wait_duration_seconds', 'Time spent waiting for a pooled database connection'
+))
+DB_POOL_CHECKOUTS = registry.register(Counter(
+    'ai_reports_db_pool_checkouts_total', 'Database pool checkouts by outcome (ok, timeout)'
+))
+LLM_REQUESTS = registry.register(Gauge(
+    'ai_reports_llm_requests', 'LLM generations by state (in_flight, queued)'
+))
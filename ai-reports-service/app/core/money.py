@@ -0,0 +1,81 @@
+import math
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+
+class Money:
+    """
+    Exact amount of money, held as an integer number of cents
+    Amounts are converted once, when a transaction is read from the database;
+    all insights arithmetic then runs on the integer cents.
+    """
+
+    __slots__ = ('cents',)
+
+    def __init__(self, cents: int):
+        self.cents = cents
+
+    @classmethod
+    def from_amount(cls, value) -> 'Money':
+        """Money for an amount in currency units (Decimal, float, int or numeric string)"""
+        if type(value) is cls:
+            return value
+        return cls(to_cents(value))
+
+    def __float__(self) -> float:
+        return self.cents / 100
+
+    def __str__(self) -> str:
+        sign = '-' if self.cents < 0 else ''
+        units, cents = divmod(abs(self.cents), 100)
+        return f"{sign}{units}.{cents:02d}"
+
+    def __repr__(self) -> str:
+        return f"Money('{self}')"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Money) and self.cents == other.cents
+
+    def __lt__(self, other: 'Money') -> bool:
+        return self.cents < other.cents
+
+    def __hash__(self) -> int:
+        return hash(self.cents)
+
+
+def to_cents(value) -> int:
+    """
+    Whole cents for an amount in currency units
+    Sub-cent amounts are rounded half up, like PostgreSQL's ROUND(numeric).
+    Raises ValueError for non-finite or non-numeric values, TypeError for
+    unsupported types.
+    """
+    if type(value) is Money:
+        return value.cents
+
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f"Invalid amount: {value}")
+        scaled = value * 100
+        cents = round(scaled)
+        # Whole-cent floats land within rounding error of an integer
+        if abs(scaled - cents) < 1e-6:
+            return cents
+        value = Decimal(repr(value))
+    elif isinstance(value, int):
+        return value * 100
+    elif isinstance(value, str):
+        try:
+            value = Decimal(value)
+        except InvalidOperation:
+            raise ValueError(f"Invalid amount: {value!r}")
+    elif not isinstance(value, Decimal):
+        raise TypeError(f"Unsupported amount type: {type(value)}")
+
+    try:
+        numerator, denominator = value.as_integer_ratio()
+    except OverflowError:
+        raise ValueError(f"Invalid amount: {value}")
+    if 100 % denominator == 0:
+        # Whole cents, the common case
+        return numerator * (100 // denominator)
+    return int(value.scaleb(2).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
@@ -0,0 +1,164 @@
+import cProfile
+import hashlib
+import json
+import os
+import pstats
+import re
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+
+class RequestProfile:
+    """
+    cProfile data for one request
+    Only the request's CPU-bound sections (see section()) are profiled, each
+    with its own profiler, merged when the profile is saved. The event loop
+    itself never is: a profiler left on there would also record every other
+    request's coroutines that ran in the meantime.
+    """
+
+    def __init__(self, reason: str):
+        self.reason = reason                 # 'header' or 'sampled'
+        self.profilers: List[cProfile.Profile] = []
+        self.tags: Dict[str, object] = {}
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar('request_profile', default=None)
+
+# Only one request is profiled at a time, to bound the overhead
+_active_lock = threading.Lock()
+
+# cProfile hooks a whole thread, so sections don't nest
+_in_section = threading.local()
+
+
+def should_profile(token: Optional[str]) -> Optional[str]:
+    """Why a request should be profiled ('header' or 'sampled'), or None"""
+    if token and settings.PROFILE_ADMIN_TOKEN and secrets.compare_digest(token, settings.PROFILE_ADMIN_TOKEN):
+        return 'header'
+    if settings.PROFILE_SAMPLE_RATE and secrets.randbelow(10**6) < settings.PROFILE_SAMPLE_RATE * 10**6:
+        return 'sampled'
+    return None
+
+
+def start(reason: str) -> Optional[RequestProfile]:
+    """Start profiling the current request, unless another one is being profiled"""
+    if not _active_lock.acquire(blocking=False):
+        return None
+    profile = RequestProfile(reason)
+    _current.set(profile)
+    return profile
+
+
+def stop(profile: RequestProfile):
+    _active_lock.release()
+
+
+def tag(**tags):
+    """Attach metadata (e.g. user_id, rows) to the current request's profile"""
+    profile = _current.get()
+    if profile is None:
+        return
+    if 'user_id' in tags:
+        # Never store the raw user id next to the profile
+        tags['user'] = hashlib.sha256(str(tags.pop('user_id')).encode()).hexdigest()[:12]
+    profile.tags.update(tags)
+
+
+@contextmanager
+def section():
+    """
+    Profile a block of synchronous work for the current request, if it's profiled
+    On the event loop thread the block must not await, so that nothing else
+    runs while its profiler is on; in worker threads anything goes.
+    """
+    profile = _current.get()
+    if profile is None or getattr(_in_section, 'active', False):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    _in_section.active = True
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _in_section.active = False
+        profile.profilers.append(profiler)
+
+
+def save(profile: RequestProfile, route: str, duration: float) -> str:
+    """
+    Write the profile as a pstats file with a JSON sidecar of its metadata
+    Returns the artifact name
+    """
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+
+    stamp = datetime.now(timezone.utc)
+    user = profile.tags.get('user', 'anonymous')
+    rows = profile.tags.get('rows', 0)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+    name = f"{stamp.strftime('%Y%m%dT%H%M%S%f')}_{slug}_{user}_{rows}rows"
+
+    stats = pstats.Stats(*profile.profilers)
+    stats.dump_stats(os.path.join(settings.PROFILE_DIR, f"{name}.pstats"))
+
+    with open(os.path.join(settings.PROFILE_DIR, f"{name}.json"), 'w') as f:
+        json.dump({
+            'name': name,
+            'route': route,
+            'reason': profile.reason,
+            'duration_seconds': duration,
+            'created_at': stamp.isoformat(),
+            **profile.tags
+        }, f)
+
+    _prune()
+    return name
+
+
+def _prune():
+    """Keep only the newest PROFILE_MAX_FILES profiles"""
+    for entry in list_profiles()[settings.PROFILE_MAX_FILES:]:
+        for ext in ('.pstats', '.json'):
+            try:
+                os.remove(os.path.join(settings.PROFILE_DIR, entry['name'] + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[Dict]:
+    """Saved profiles' metadata, newest first"""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+
+    entries = []
+    for filename in os.listdir(settings.PROFILE_DIR):
+        if filename.endswith('.json'):
+            with open(os.path.join(settings.PROFILE_DIR, filename)) as f:
+                entries.append(json.load(f))
+    return sorted(entries, key=lambda entry: entry['name'], reverse=True)
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Path of a saved pstats file, or None (names are validated, not trusted)"""
+    if not re.fullmatch(r'[A-Za-z0-9_-]+', name):
+        return None
+    path = os.path.join(settings.PROFILE_DIR, f"{name}.pstats")
+    return path if os.path.isfile(path) else None
+
+
+def should_keep(profile: RequestProfile, duration: float) -> bool:
+    """
+    Requested profiles are always kept, sampled ones only for slow requests;
+    neither if no section ran (e.g. served from a cache)
+    """
+    if not profile.profilers:
+        return False
+    return profile.reason == 'header' or duration >= settings.PROFILE_SLOW_REQUEST_SECONDS
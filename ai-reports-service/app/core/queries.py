@@ -0,0 +1,536 @@
+# SQL and row conversion shared by DatabaseManager and AsyncDatabaseManager.
+# Both drivers use %s placeholders and return the same Python types, so each
+# query is written once here and executed by either manager.
+from typing import List, Dict, Optional, Tuple, Any
+from datetime import date, datetime
+import base64
+import binascii
+import json
+from app.core import compression, serialization
+from app.core.categories import get_category_name
+from app.core.config import settings
+from app.core.money import Money
+from app.core.records import Transaction
+from app.services.aggregates import MAX_ANOMALIES
+
+
+# Columns of a transaction row, in SELECT order: only what Transaction holds
+TRANSACTION_COLUMNS = Transaction.__slots__
+
+# SQL for each column; amounts are read as integer cents (rounded like
+# Money), so the driver never builds a Decimal per row
+TRANSACTION_SELECT = ', '.join(
+    'ROUND(amount::numeric * 100)::bigint AS amount' if column == 'amount' else column
+    for column in TRANSACTION_COLUMNS
+)
+
+
+def build_transactions_query(
+    user_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    months: Optional[List[date]] = None
+) -> Tuple[str, List]:
+    """Query for a user's transactions, newest first"""
+    query = f"""
+        SELECT {TRANSACTION_SELECT}
+        FROM transactions
+        WHERE user_id = %s
+    """
+    params = [user_id]
+
+    if start_date:
+        query += " AND date >= %s"
+        params.append(start_date)
+
+    if end_date:
+        query += " AND date <= %s"
+        params.append(end_date)
+
+    if months is not None:
+        query += " AND date_trunc('month', date)::date = ANY(%s)"
+        params.append(list(months))
+
+    # id breaks ties between same-day rows, so the row order (and with it
+    # every first-seen tie-break in the insights) is deterministic
+    query += " ORDER BY date DESC, id"
+    return query, params
+
+
+def build_users_transactions_query(
+    user_ids: List[str],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Tuple[str, List]:
+    """
+    Query for several users' transactions: user_id, then TRANSACTION_COLUMNS
+    Rows come grouped by user, each user's in build_transactions_query order
+    """
+    query = f"""
+        SELECT user_id, {TRANSACTION_SELECT}
+        FROM transactions
+        WHERE user_id = ANY(%s::uuid[])
+    """
+    params = [list(user_ids)]
+
+    if start_date:
+        query += " AND date >= %s"
+        params.append(start_date)
+
+    if end_date:
+        query += " AND date <= %s"
+        params.append(end_date)
+
+    query += " ORDER BY user_id, date DESC, id"
+    return query, params
+
+
+def transaction_from_row(row: Tuple) -> Transaction:
+    """Convert a transaction row (a tuple in TRANSACTION_COLUMNS order) to a record"""
+    kind, cents, category_id, description, when = row
+    # Amount comes in cents; convert category_id to name
+    return Transaction(kind, Money(cents), get_category_name(int(category_id)), description, when)
+
+
+def build_aggregates_query(
+    user_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Tuple[str, List]:
+    """
+    Query for everything TransactionAggregates holds, grouped in PostgreSQL
+    Returns one row per (type, category), per (type, date), and one per
+    largest-amount candidate, ordered by first appearance in the row order
+    of build_transactions_query so first-seen tie-breaks come out the same.
+    Amounts come back in integer cents, rounded like Money.
+    Filters out the rows FinancialDataProcessor would reject as invalid.
+    """
+    filters = ""
+    params = [user_id]
+
+    if start_date:
+        filters += " AND date >= %s"
+        params.append(start_date)
+
+    if end_date:
+        filters += " AND date <= %s"
+        params.append(end_date)
+
+    query = f"""
+        WITH t AS (
+            SELECT type, ROUND(amount::numeric * 100) AS amount, category_id, description, date,
+                   ROW_NUMBER() OVER (ORDER BY date DESC, id) AS rn,
+                   ROW_NUMBER() OVER (PARTITION BY type ORDER BY date DESC, id) AS type_rn
+            FROM transactions
+            WHERE user_id = %s{filters}
+              AND type IN ('income', 'expense')
+              AND ROUND(amount::numeric * 100) >= 0
+              AND date IS NOT NULL
+        )
+        SELECT 'category' AS kind, type, category_id, NULL AS date,
+               SUM(amount) AS total, COUNT(*) AS count, MAX(amount) AS largest,
+               SUM(amount * amount) AS sum_of_squares,
+               NULL AS description, NULL::bigint AS seq, MIN(rn) AS first_seen
+        FROM t
+        GROUP BY type, category_id
+        UNION ALL
+        SELECT 'date', type, NULL, date,
+               SUM(amount), COUNT(*), NULL, NULL,
+               NULL, NULL, MIN(rn)
+        FROM t
+        GROUP BY type, date
+        UNION ALL
+        (
+            SELECT 'largest', type, category_id, date,
+                   amount, NULL, NULL, NULL,
+                   description, type_rn, rn
+            FROM t
+            WHERE type = 'expense'
+            ORDER BY amount DESC, rn
+            LIMIT %s
+        )
+        UNION ALL
+        (
+            SELECT 'largest', type, category_id, date,
+                   amount, NULL, NULL, NULL,
+                   description, type_rn, rn
+            FROM t
+            WHERE type = 'income'
+            ORDER BY amount DESC, rn
+            LIMIT 1
+        )
+        ORDER BY first_seen, kind
+    """
+    params.append(MAX_ANOMALIES)
+    return query, params
+
+
+def aggregate_row_from_row(row) -> Dict:
+    """Convert a build_aggregates_query row, mapping its category name"""
+    aggregate_row = dict(row)
+    if aggregate_row['category_id'] is not None:
+        aggregate_row['category_id'] = get_category_name(int(aggregate_row['category_id']))
+    return aggregate_row
+
+
+def build_watermarks_query(
+    user_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Tuple[str, List]:
+    """Query for transaction count and latest update time per calendar month"""
+    query = """
+        SELECT date_trunc('month', date)::date AS month,
+               COUNT(*) AS num_transactions,
+               MAX(updated_at) AS last_updated_at
+        FROM transactions
+        WHERE user_id = %s
+    """
+    params = [user_id]
+
+    if start_date:
+        query += " AND date >= %s"
+        params.append(start_date)
+
+    if end_date:
+        query += " AND date <= %s"
+        params.append(end_date)
+
+    query += " GROUP BY 1"
+    return query, params
+
+
+def build_range_watermark_query(
+    user_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> Tuple[str, List]:
+    """Query for transaction count and latest update time over the whole range"""
+    query = """
+        SELECT COUNT(*) AS num_transactions,
+               MAX(updated_at) AS last_updated_at
+        FROM transactions
+        WHERE user_id = %s
+    """
+    params = [user_id]
+
+    if start_date:
+        query += " AND date >= %s"
+        params.append(start_date)
+
+    if end_date:
+        query += " AND date <= %s"
+        params.append(end_date)
+
+    return query, params
+
+
+# Snapshots whose month still has the transaction count and latest update
+# time they were saved with (compared in SQL so timestamp types don't matter)
+INSIGHT_SNAPSHOTS_SQL = """
+    SELECT s.month, s.aggregates
+    FROM ai_insight_snapshots s
+    JOIN (
+        SELECT date_trunc('month', date)::date AS month,
+               COUNT(*) AS num_transactions,
+               MAX(updated_at) AS last_updated_at
+        FROM transactions
+        WHERE user_id = %s AND date_trunc('month', date)::date = ANY(%s)
+        GROUP BY 1
+    ) w ON w.month = s.month
+       AND w.num_transactions = s.num_transactions
+       AND w.last_updated_at IS NOT DISTINCT FROM s.last_updated_at
+    WHERE s.user_id = %s AND s.month = ANY(%s)
+"""
+
+
+def insight_snapshots_params(user_id: str, months: List[date]) -> Tuple:
+    return (user_id, list(months), user_id, list(months))
+
+
+def snapshots_from_rows(rows) -> Dict[date, Dict]:
+    """Map month -> saved aggregates dict"""
+    snapshots = {}
+    for row in rows:
+        aggregates = row['aggregates']
+        if isinstance(aggregates, str):
+            aggregates = json.loads(aggregates)
+        snapshots[row['month']] = aggregates
+    return snapshots
+
+
+SAVE_INSIGHT_SNAPSHOT_SQL = """
+    INSERT INTO ai_insight_snapshots (
+        user_id, month, num_transactions, last_updated_at, aggregates
+    ) VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (user_id, month) DO UPDATE SET
+        num_transactions = EXCLUDED.num_transactions,
+        last_updated_at = EXCLUDED.last_updated_at,
+        aggregates = EXCLUDED.aggregates,
+        created_at = NOW()
+"""
+
+
+def save_insight_snapshot_params(user_id: str, snapshots: List[Dict]) -> List[Tuple]:
+    return [
+        (
+            user_id,
+            snapshot['month'],
+            snapshot['num_transactions'],
+            snapshot['last_updated_at'],
+            json.dumps(snapshot['aggregates'])
+        )
+        for snapshot in snapshots
+    ]
+
+
+USER_PROFILE_SQL = """
+    SELECT user_id, name, financial_goals, risk_tolerance
+    FROM user_profiles
+    WHERE user_id = %s
+"""
+
+
+def profile_from_row(row) -> Dict:
+    profile = dict(row)
+    profile['user_id'] = str(profile['user_id'])
+    # Parse financial_goals if stored as JSON
+    if profile.get('financial_goals'):
+        if isinstance(profile['financial_goals'], str):
+            try:
+                profile['financial_goals'] = json.loads(profile['financial_goals'])
+            except:
+                profile['financial_goals'] = []
+    return profile
+
+
+# Codec for new report bodies, or None to store them as plain text/JSONB.
+# Compressed bodies go to the *_compressed columns and the plain ones stay
+# NULL. Both are always read (migrations/005), so plain and compressed rows
+# load whatever the setting, e.g. after scripts/compress_reports.py
+REPORT_COMPRESSION = None if settings.REPORT_COMPRESSION == 'none' else settings.REPORT_COMPRESSION
+if REPORT_COMPRESSION:
+    compression.check_codec(REPORT_COMPRESSION)
+
+REPORT_BODY_COLUMNS = (
+    "report_text_compressed, processed_insights_compressed" if REPORT_COMPRESSION
+    else "report_text, processed_insights"
+)
+
+SAVE_REPORT_SQL = f"""
+    INSERT INTO ai_reports (
+        user_id, {REPORT_BODY_COLUMNS},
+        start_date, end_date, num_transactions,
+        savings_rate, total_income, total_expenses, model_used
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    RETURNING id
+"""
+
+
+def save_report_params(
+    user_id: str,
+    report_text: str,
+    processed_insights: Dict,
+    start_date: Optional[str],
+    end_date: Optional[str],
+    model_used: str
+) -> Tuple:
+    # Extract summary data
+    summary = processed_insights.get('summary', {})
+    time_period = processed_insights.get('time_period', {})
+
+    # Reuses the response's encoding when the insights are a SerializedDict
+    insights_json = serialization.dumps(processed_insights)
+    if REPORT_COMPRESSION:
+        report_text = compression.compress_text(report_text, REPORT_COMPRESSION)
+        insights_json = compression.compress(insights_json, REPORT_COMPRESSION)
+    else:
+        insights_json = insights_json.decode()  # PostgreSQL handles JSON automatically
+
+    return (
+        user_id,
+        report_text,
+        insights_json,
+        start_date,
+        end_date,
+        time_period.get('num_transactions', 0),
+        summary.get('savings_rate'),
+        summary.get('total_income'),
+        summary.get('total_expenses'),
+        model_used
+    )
+
+
+# Report history lists only these columns; report_text and
+# processed_insights are loaded with the report itself
+REPORT_SUMMARY_COLUMNS = """
+        id, user_id, start_date, end_date, num_transactions,
+        savings_rate, total_income, total_expenses,
+        model_used, created_at"""
+
+REPORT_COLUMNS = REPORT_SUMMARY_COLUMNS + """,
+        report_text, processed_insights,
+        report_text_compressed, processed_insights_compressed"""
+
+
+def build_user_reports_query(
+    user_id: str,
+    limit: int,
+    after: Optional[Tuple[str, int]] = None,
+    include_body: bool = False
+) -> Tuple[str, List]:
+    """
+    Query for a page of a user's reports, most recent first
+    Keyset pagination: after is the (created_at, id) of the previous page's
+    last report, so every page is an index range scan on
+    (user_id, created_at DESC, id DESC) however deep it is. One row more than
+    limit is fetched to tell whether another page follows.
+    """
+    query = f"""
+        SELECT {REPORT_COLUMNS if include_body else REPORT_SUMMARY_COLUMNS}
+        FROM ai_reports
+        WHERE user_id = %s
+    """
+    params = [user_id]
+
+    if after is not None:
+        query += " AND (created_at, id) < (%s::timestamptz, %s)"
+        params.extend(after)
+
+    query += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    params.append(limit + 1)
+    return query, params
+
+
+def encode_report_cursor(report: Dict[str, Any]) -> str:
+    """Opaque history cursor pointing just past a report"""
+    key = json.dumps([report['created_at'].isoformat(), report['id']])
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip('=')
+
+
+def decode_report_cursor(cursor: str) -> Tuple[str, int]:
+    """(created_at, id) from a history cursor; raises ValueError if it's malformed"""
+    try:
+        created_at, report_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        # Re-formatted, so PostgreSQL never sees an ISO variant it can't parse
+        created_at = datetime.fromisoformat(created_at).isoformat()
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError("Invalid history cursor")
+    if type(report_id) is not int:
+        raise ValueError("Invalid history cursor")
+    return created_at, report_id
+
+
+def reports_page_from_rows(rows: List, limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """(reports, next page cursor or None) for the rows of build_user_reports_query"""
+    reports = [report_from_row(row) for row in rows[:limit]]
+    next_cursor = encode_report_cursor(reports[-1]) if len(rows) > limit else None
+    return reports, next_cursor
+
+
+REPORT_BY_ID_SQL = f"""
+    SELECT {REPORT_COLUMNS}
+    FROM ai_reports
+    WHERE id = %s AND user_id = %s
+"""
+
+
+def report_from_row(row) -> Dict[str, Any]:
+    report = dict(row)
+    report['user_id'] = str(report['user_id'])
+    # Each body is in either its plain or its compressed column; decode whichever is set
+    for column in ('report_text', 'processed_insights'):
+        blob = report.pop(f"{column}_compressed", None)
+        if blob is not None:
+            report[column] = compression.decompress_text(blob)
+    # Parse JSON insights (PostgreSQL may return as dict already)
+    if isinstance(report.get('processed_insights'), str):
+        try:
+            report['processed_insights'] = json.loads(report['processed_insights'])
+        except:
+            report['processed_insights'] = {}
+    return report
+
+
+DELETE_REPORT_SQL = """
+    DELETE FROM ai_reports
+    WHERE id = %s AND user_id = %s
+"""
+
+
+# Generated reports by prompt hash (see services/llm_cache.py)
+CACHED_LLM_RESPONSE_SQL = """
+    SELECT response, created_at
+    FROM ai_llm_cache
+    WHERE prompt_hash = %s
+      AND created_at > NOW() - make_interval(secs => %s)
+"""
+
+SAVE_CACHED_LLM_RESPONSE_SQL = """
+    INSERT INTO ai_llm_cache (prompt_hash, model_used, response)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (prompt_hash) DO UPDATE SET
+        model_used = EXCLUDED.model_used,
+        response = EXCLUDED.response,
+        created_at = NOW()
+"""
+
+# Drop expired entries and everything past the newest max_entries
+PRUNE_LLM_CACHE_SQL = """
+    DELETE FROM ai_llm_cache
+    WHERE created_at <= NOW() - make_interval(secs => %s)
+       OR prompt_hash IN (
+           SELECT prompt_hash FROM ai_llm_cache
+           ORDER BY created_at DESC
+           OFFSET %s
+       )
+"""
+
+
+# Background report jobs (see services/report_jobs.py)
+REPORT_JOB_COLUMNS = "id, user_id, start_date, end_date, status, result, error, created_at, updated_at"
+
+CREATE_REPORT_JOB_SQL = f"""
+    INSERT INTO ai_report_jobs (user_id, start_date, end_date)
+    VALUES (%s, %s, %s)
+    RETURNING {REPORT_JOB_COLUMNS}
+"""
+
+# Jobs not updated for a while are considered lost (e.g. the process restarted)
+ACTIVE_REPORT_JOB_SQL = f"""
+    SELECT {REPORT_JOB_COLUMNS}
+    FROM ai_report_jobs
+    WHERE user_id = %s
+      AND start_date IS NOT DISTINCT FROM %s::date
+      AND end_date IS NOT DISTINCT FROM %s::date
+      AND status IN ('pending', 'running')
+      AND updated_at > NOW() - make_interval(secs => %s)
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
+
+UPDATE_REPORT_JOB_SQL = """
+    UPDATE ai_report_jobs
+    SET status = %s, result = %s, error = %s, updated_at = NOW()
+    WHERE id = %s
+"""
+
+REPORT_JOB_BY_ID_SQL = f"""
+    SELECT {REPORT_JOB_COLUMNS}
+    FROM ai_report_jobs
+    WHERE id = %s AND user_id = %s
+"""
+
+
+def update_report_job_params(job_id: str, status: str, result: Optional[Dict], error: Optional[str]) -> Tuple:
+    # result holds the report's processed_insights, already encoded once
+    return (status, serialization.dumps(result).decode() if result is not None else None, error, job_id)
+
+
+def report_job_from_row(row) -> Dict[str, Any]:
+    job = dict(row)
+    job['id'] = str(job['id'])
+    job['user_id'] = str(job['user_id'])
+    if isinstance(job['result'], str):
+        job['result'] = json.loads(job['result'])
+    return job
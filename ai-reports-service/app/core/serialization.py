@@ -0,0 +1,68 @@
+# Fast JSON encoding for large responses and the JSON written to the database.
+# Uses orjson, with the same output as FastAPI's default encoding for the
+# types the routes return (dicts, lists, numbers, dates, UUIDs, Decimals).
+from decimal import Decimal
+from typing import Any, Optional
+import orjson
+from fastapi.responses import JSONResponse
+from app.core.money import Money
+from app.core import profiling
+
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        # Like FastAPI's jsonable_encoder: whole Decimals become ints
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, Money):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class SerializedDict(dict):
+    """
+    dict that keeps its JSON encoding once computed
+    Used for processed_insights, so the same bytes go into the database and
+    into the response body. Don't modify it after .json has been read.
+    """
+
+    __slots__ = ('_json',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._json: Optional[bytes] = None
+
+    @property
+    def json(self) -> bytes:
+        if self._json is None:
+            self._json = orjson.dumps(self, default=_default, option=OPTIONS)
+        return self._json
+
+
+def dumps(content: Any) -> bytes:
+    """
+    JSON bytes for content
+    A SerializedDict, or one directly inside a top-level dict, is written
+    from its stored encoding instead of being encoded again.
+    """
+    if type(content) is SerializedDict:
+        return content.json
+    if type(content) is dict and any(type(value) is SerializedDict for value in content.values()):
+        return b'{' + b','.join(
+            orjson.dumps(str(key)) + b':' + dumps(value) for key, value in content.items()
+        ) + b'}'
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson
+    Return it directly from a route (instead of a dict or a response model)
+    to skip FastAPI's validation and jsonable_encoder pass over large payloads.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with profiling.section():
+            return dumps(content)
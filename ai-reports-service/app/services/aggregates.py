@@ -0,0 +1,320 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Any
+import heapq
+import math
+from app.core.money import Money
+from app.core.records import Transaction
+
+
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Number of largest expenses kept as anomaly candidates
+MAX_ANOMALIES = 5
+
+
+def weekday(day: int) -> int:
+    """Weekday (Monday is 0) of a proleptic Gregorian day ordinal (day 1 was a Monday)"""
+    return (day + 6) % 7
+
+
+def _day_from_saved(value) -> int:
+    """Day ordinal from a snapshot; older snapshots stored ISO datetimes"""
+    return datetime.fromisoformat(value).toordinal() if isinstance(value, str) else value
+
+
+def expense_detail(t: Transaction) -> Dict:
+    """How a largest-expense candidate is reported in the anomalies"""
+    return {
+        'amount': t.amount.cents / 100,
+        'date': str(t.date),
+        'description': str(t.description),
+        'category': str(t.category_id) if t.category_id is not None else 'unknown'
+    }
+
+
+def _cents_from_saved(value, exponent: int = 2) -> int:
+    """Cents from a snapshot; older snapshots stored Decimal strings in currency units"""
+    return int(Decimal(value).scaleb(exponent)) if isinstance(value, str) else value
+
+
+class TransactionAggregates:
+    """
+    Running totals collected in a single pass over transactions
+    Every section of FinancialDataProcessor.process() is derived from this state,
+    so the transactions themselves never need to be kept or revisited.
+    Dates are day ordinals (date.toordinal()), parsed once per transaction,
+    and amounts are integer cents, so every total is exact.
+    """
+
+    def __init__(self):
+        self.num_transactions = 0
+        self.first_day: Optional[int] = None
+        self.last_day: Optional[int] = None
+
+        # Income
+        self.total_income = 0
+        self.num_income = 0
+        self.income_by_category: Dict[str, int] = {}
+        self.largest_income: Optional[Dict] = None
+
+        # Expenses
+        self.total_expenses = 0
+        self.num_expenses = 0
+        self.expense_sum_of_squares = 0                   # in cents squared
+        self.expenses_by_category: Dict[str, List] = {}   # category -> [total, count, largest]
+        self.expenses_by_weekday: Dict[int, List] = {}    # weekday -> [total, count]
+        self.expenses_by_day: Dict[int, int] = {}
+        self.largest_expenses: List = []                  # min-heap of (amount, -seq, transaction)
+
+    def add(self, t: Transaction, day: int):
+        """Fold one validated transaction, dated day (an ordinal), into the totals"""
+        amount = t.amount.cents
+
+        self.num_transactions += 1
+        if self.first_day is None or day < self.first_day:
+            self.first_day = day
+        if self.last_day is None or day > self.last_day:
+            self.last_day = day
+
+        if t.type == 'income':
+            self.total_income += amount
+            self.num_income += 1
+
+            cat = t.category_id if t.category_id is not None else 'other'
+            self.income_by_category[cat] = self.income_by_category.get(cat, 0) + amount
+
+            if self.largest_income is None or amount > self.largest_income['value']:
+                self.largest_income = {
+                    'value': amount,
+                    'amount': amount / 100,
+                    'date': str(t.date),
+                    'category': str(t.category_id) if t.category_id is not None else 'unknown'
+                }
+            return
+
+        self.total_expenses += amount
+        self.num_expenses += 1
+        self.expense_sum_of_squares += amount * amount
+
+        cat = t.category_id if t.category_id is not None else 'uncategorized'
+        stats = self.expenses_by_category.get(cat)
+        if stats is None:
+            self.expenses_by_category[cat] = [amount, 1, amount]
+        else:
+            stats[0] += amount
+            stats[1] += 1
+            if amount > stats[2]:
+                stats[2] = amount
+
+        day_of_week = weekday(day)
+        stats = self.expenses_by_weekday.get(day_of_week)
+        if stats is None:
+            self.expenses_by_weekday[day_of_week] = [amount, 1]
+        else:
+            stats[0] += amount
+            stats[1] += 1
+
+        self.expenses_by_day[day] = self.expenses_by_day.get(day, 0) + amount
+
+        # Keep the largest expenses; on equal amounts the earlier one wins
+        if len(self.largest_expenses) < MAX_ANOMALIES or amount > self.largest_expenses[0][0]:
+            candidate = (amount, -self.num_expenses, expense_detail(t))
+            if len(self.largest_expenses) < MAX_ANOMALIES:
+                heapq.heappush(self.largest_expenses, candidate)
+            else:
+                heapq.heapreplace(self.largest_expenses, candidate)
+
+    def merge(self, other: 'TransactionAggregates'):
+        """
+        Fold another set of totals into this one
+        other's transactions count as coming after this one's, which only
+        matters for breaking ties (first category seen, first largest amount)
+        """
+        self.num_transactions += other.num_transactions
+        for day in (other.first_day, other.last_day):
+            if day is None:
+                continue
+            if self.first_day is None or day < self.first_day:
+                self.first_day = day
+            if self.last_day is None or day > self.last_day:
+                self.last_day = day
+
+        self.total_income += other.total_income
+        self.num_income += other.num_income
+        for cat, total in other.income_by_category.items():
+            self.income_by_category[cat] = self.income_by_category.get(cat, 0) + total
+        if other.largest_income is not None and (
+                self.largest_income is None or other.largest_income['value'] > self.largest_income['value']):
+            self.largest_income = other.largest_income
+
+        for cat, (total, count, largest) in other.expenses_by_category.items():
+            stats = self.expenses_by_category.get(cat)
+            if stats is None:
+                self.expenses_by_category[cat] = [total, count, largest]
+            else:
+                stats[0] += total
+                stats[1] += count
+                if largest > stats[2]:
+                    stats[2] = largest
+
+        for weekday, (total, count) in other.expenses_by_weekday.items():
+            day = self.expenses_by_weekday.get(weekday)
+            if day is None:
+                self.expenses_by_weekday[weekday] = [total, count]
+            else:
+                day[0] += total
+                day[1] += count
+
+        for day, total in other.expenses_by_day.items():
+            self.expenses_by_day[day] = self.expenses_by_day.get(day, 0) + total
+
+        # Renumber other's candidates so they rank after ours on equal amounts
+        candidates = self.largest_expenses + [
+            (amount, neg_seq - self.num_expenses, t) for amount, neg_seq, t in other.largest_expenses
+        ]
+        self.largest_expenses = heapq.nlargest(MAX_ANOMALIES, candidates)
+        heapq.heapify(self.largest_expenses)
+
+        self.total_expenses += other.total_expenses
+        self.num_expenses += other.num_expenses
+        self.expense_sum_of_squares += other.expense_sum_of_squares
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-safe representation, used to persist snapshots"""
+        # Mappings are stored as pair lists: JSONB doesn't keep key order.
+        # Amounts are integer cents (older snapshots used Decimal strings).
+        return {
+            'num_transactions': self.num_transactions,
+            'first_day': self.first_day,
+            'last_day': self.last_day,
+            'total_income': self.total_income,
+            'num_income': self.num_income,
+            'income_by_category': [[cat, total] for cat, total in self.income_by_category.items()],
+            'largest_income': self.largest_income,
+            'total_expenses': self.total_expenses,
+            'num_expenses': self.num_expenses,
+            'expense_sum_of_squares': self.expense_sum_of_squares,
+            'expenses_by_category': [
+                [cat, total, count, largest]
+                for cat, (total, count, largest) in self.expenses_by_category.items()
+            ],
+            'expenses_by_weekday': [
+                [weekday, total, count] for weekday, (total, count) in self.expenses_by_weekday.items()
+            ],
+            'expenses_by_day': [[day, total] for day, total in self.expenses_by_day.items()],
+            'largest_expenses': [[amount, neg_seq, t] for amount, neg_seq, t in self.largest_expenses],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'TransactionAggregates':
+        """Rebuild aggregates saved with to_dict()"""
+        agg = cls()
+        agg.num_transactions = data['num_transactions']
+        first_day = data.get('first_day', data.get('first_date'))
+        last_day = data.get('last_day', data.get('last_date'))
+        agg.first_day = _day_from_saved(first_day) if first_day else None
+        agg.last_day = _day_from_saved(last_day) if last_day else None
+
+        agg.total_income = _cents_from_saved(data['total_income'])
+        agg.num_income = data['num_income']
+        agg.income_by_category = {cat: _cents_from_saved(total) for cat, total in data['income_by_category']}
+        if data['largest_income'] is not None:
+            agg.largest_income = {
+                **data['largest_income'], 'value': _cents_from_saved(data['largest_income']['value'])
+            }
+
+        agg.total_expenses = _cents_from_saved(data['total_expenses'])
+        agg.num_expenses = data['num_expenses']
+        agg.expense_sum_of_squares = _cents_from_saved(data['expense_sum_of_squares'], 4)
+        agg.expenses_by_category = {
+            cat: [_cents_from_saved(total), count, _cents_from_saved(largest)]
+            for cat, total, count, largest in data['expenses_by_category']
+        }
+        agg.expenses_by_weekday = {
+            weekday: [_cents_from_saved(total), count] for weekday, total, count in data['expenses_by_weekday']
+        }
+        agg.expenses_by_day = {
+            _day_from_saved(day): _cents_from_saved(total)
+            for day, total in data.get('expenses_by_day', data.get('expenses_by_date', []))
+        }
+        agg.largest_expenses = [
+            (_cents_from_saved(amount), neg_seq, t) for amount, neg_seq, t in data['largest_expenses']
+        ]
+        heapq.heapify(agg.largest_expenses)
+        return agg
+
+    @classmethod
+    def from_grouped_rows(cls, rows) -> 'TransactionAggregates':
+        """
+        Build aggregates from rows grouped by the database (queries.build_aggregates_query)
+        Reaches the same state add() would over the same transactions in the same order;
+        the query returns amounts in cents already
+        """
+        agg = cls()
+        for row in rows:
+            kind, is_income = row['kind'], row['type'] == 'income'
+            total = int(row['total'])
+
+            if kind == 'category':
+                cat = row['category_id']
+                if is_income:
+                    agg.total_income += total
+                    agg.num_income += row['count']
+                    agg.income_by_category[cat] = agg.income_by_category.get(cat, 0) + total
+                    continue
+
+                agg.total_expenses += total
+                agg.num_expenses += row['count']
+                agg.expense_sum_of_squares += int(row['sum_of_squares'])
+                largest = int(row['largest'])
+                stats = agg.expenses_by_category.get(cat)
+                if stats is None:
+                    agg.expenses_by_category[cat] = [total, row['count'], largest]
+                else:
+                    stats[0] += total
+                    stats[1] += row['count']
+                    if largest > stats[2]:
+                        stats[2] = largest
+
+            elif kind == 'date':
+                day = row['date'].toordinal()
+
+                agg.num_transactions += row['count']
+                if agg.first_day is None or day < agg.first_day:
+                    agg.first_day = day
+                if agg.last_day is None or day > agg.last_day:
+                    agg.last_day = day
+
+                if not is_income:
+                    stats = agg.expenses_by_weekday.setdefault(weekday(day), [0, 0])
+                    stats[0] += total
+                    stats[1] += row['count']
+                    agg.expenses_by_day[day] = agg.expenses_by_day.get(day, 0) + total
+
+            elif is_income:
+                agg.largest_income = {
+                    'value': total,
+                    'amount': total / 100,
+                    'date': str(row['date']),
+                    'category': str(row['category_id'])
+                }
+
+            else:
+                agg.largest_expenses.append((total, -row['seq'], expense_detail(
+                    Transaction('expense', Money(total), row['category_id'], row['description'], row['date'])
+                )))
+
+        heapq.heapify(agg.largest_expenses)
+        return agg
+
+    def expense_mean_and_std(self):
+        """Mean and sample standard deviation of expense amounts, in currency units"""
+        n, total = self.num_expenses, self.total_expenses
+        # n * sum(x^2) - sum(x)^2 is exact in integer cents
+        variance = max(n * self.expense_sum_of_squares - total * total, 0) / (n * (n - 1))
+        return total / (100 * n), math.sqrt(variance) / 100
+
+    def top_expenses(self) -> List:
+        """Largest expenses, biggest first, as (amount, transaction) pairs"""
+        return [(amount, t) for amount, _, t in sorted(self.largest_expenses, reverse=True)]
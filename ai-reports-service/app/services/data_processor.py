@@ -1,62 +1,105 @@
 from datetime import datetime, date
-from collections import defaultdict
-from typing import List, Dict, Any
-from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
+from app.core.money import Money
+from app.core.records import Transaction
+from app.services.aggregates import TransactionAggregates, DAY_NAMES
 
 
 class FinancialDataProcessor:
     """Processes raw transaction data into structured insights"""
     
-    def __init__(self, transactions: List[Dict], user_profile: Dict = None):
-        # Validate and filter transactions
-        self.transactions = [t for t in transactions if self._validate_transaction(t)]
+    def __init__(
+        self,
+        transactions: Iterable[Union[Transaction, Dict]],
+        user_profile: Dict = None,
+        snapshots: List[TransactionAggregates] = None
+    ):
+        # transactions may be any iterable (e.g. rows streamed from a
+        # server-side cursor) of Transaction records or dicts with the same
+        # keys; it is consumed exactly once
+        self.aggregates = self._aggregate(transactions)
+        
+        # Saved aggregates for periods not included in transactions
+        for snapshot in snapshots or []:
+            self.aggregates.merge(snapshot)
         
-        if len(self.transactions) < len(transactions):
+        self.user_profile = user_profile or {}
+        self.insights = {}
+
+    def _aggregate(self, transactions: Iterable) -> TransactionAggregates:
+        """Validate transactions and fold them into the aggregates in one pass"""
+        aggregates = TransactionAggregates()
+        invalid_count = 0
+        for t in transactions:
+            parsed = self._parse_transaction(t)
+            if parsed is not None:
+                aggregates.add(*parsed)
+            else:
+                invalid_count += 1
+        
+        if invalid_count:
             # Log warning about invalid transactions
-            invalid_count = len(transactions) - len(self.transactions)
             print(f"Warning: {invalid_count} invalid transactions filtered")
         
-        self.user_profile = user_profile or {}
-        self.insights = {}
+        return aggregates
 
-    def _validate_transaction(self, t: Dict) -> bool:
+    def _validate_transaction(self, t: Union[Transaction, Dict]) -> bool:
         """Validate transaction structure and data"""
-        required_fields = ['amount', 'date', 'type']
-        
-        # Check required fields exist
-        if not all(field in t for field in required_fields):
-            return False
+        return self._parse_transaction(t) is not None
+    
+    def _parse_transaction(self, t: Union[Transaction, Dict]) -> Optional[Tuple[Transaction, int]]:
+        """
+        Validate a transaction and return it as a record with its day ordinal
+        Returns None for invalid transactions; amount and date are parsed only here
+        """
+        if type(t) is not Transaction:
+            t = self._record_from_dict(t)
+            if t is None:
+                return None
         
         # Validate type
-        if t['type'] not in ['income', 'expense']:
-            return False
+        if t.type not in ('income', 'expense'):
+            return None
         
-        # Validate amount is numeric and positive
+        # Validate amount is positive
+        if t.amount.cents < 0:
+            return None
+        
+        # Validate date can be parsed
         try:
-            amount = float(t['amount'])
-            if amount < 0:
-                return False
+            return t, self._parse_day(t.date)
         except (ValueError, TypeError):
-            return False
+            return None
+    
+    def _record_from_dict(self, t: Dict) -> Optional[Transaction]:
+        """Transaction record for a dict with the same keys, or None if it can't be one"""
+        required_fields = ['amount', 'date', 'type']
         
-        # Validate date can be parsed
+        # Check required fields exist
+        if not all(field in t for field in required_fields):
+            return None
+        
+        # Validate amount is numeric
         try:
-            self._parse_date(t['date'])
+            amount = Money.from_amount(t['amount'])
         except (ValueError, TypeError):
-            return False
+            return None
         
-        return True
+        # A missing description reads as 'No description', an explicit None as 'None'
+        return Transaction(t['type'], amount, t.get('category_id'), t.get('description', 'No description'), t['date'])
     
-    def _parse_date(self, date_value) -> datetime:
-        """Parse date from various formats (string, date object, datetime)"""
-        if isinstance(date_value, datetime):
-            return date_value
-        elif isinstance(date_value, date):
-            return datetime.combine(date_value, datetime.min.time())
+    def _parse_day(self, date_value) -> int:
+        """Parse date from various formats (string, date object, datetime) into a day ordinal"""
+        if isinstance(date_value, date):
+            # Also covers datetime; the time of day is dropped
+            return date_value.toordinal()
         elif isinstance(date_value, str):
             # Handle different string formats
-            date_str = date_value.replace('Z', '+00:00').split('T')[0]  # Get just YYYY-MM-DD
-            return datetime.strptime(date_str, '%Y-%m-%d')
+            date_str = date_value.split('T')[0]  # Get just YYYY-MM-DD
+            if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
+                # Fast path for canonical dates
+                return date.fromisoformat(date_str).toordinal()
+            return datetime.strptime(date_str, '%Y-%m-%d').toordinal()
         else:
             raise ValueError(f"Unsupported date format: {type(date_value)}")
         
@@ -78,119 +121,101 @@ class FinancialDataProcessor:
     
     def _get_time_period(self) -> Dict:
         """Determine the time period of transactions"""
-        if not self.transactions:
+        agg = self.aggregates
+        if not agg.num_transactions:
             return {}
         
-        dates = [self._parse_date(t['date']) for t in self.transactions]
         return {
-            'start_date': min(dates).strftime('%Y-%m-%d'),
-            'end_date': max(dates).strftime('%Y-%m-%d'),
-            'num_days': (max(dates) - min(dates)).days + 1,
-            'num_transactions': len(self.transactions)
+            'start_date': date.fromordinal(agg.first_day).strftime('%Y-%m-%d'),
+            'end_date': date.fromordinal(agg.last_day).strftime('%Y-%m-%d'),
+            'num_days': agg.last_day - agg.first_day + 1,
+            'num_transactions': agg.num_transactions
         }
     
     def _calculate_summary(self) -> Dict:
         """Calculate high-level financial summary"""
-        total_income = sum(Decimal(str(t['amount'])) for t in self.transactions 
-                  if t['type'] == 'income')
-        total_expenses = sum(Decimal(str(t['amount'])) for t in self.transactions 
-                  if t['type'] == 'expense')
+        total_income = self.aggregates.total_income
+        total_expenses = self.aggregates.total_expenses
         
         # Get num_days, default to 1 if not available yet
         time_period = self._get_time_period() if not self.insights else self.insights.get('time_period', {})
         num_days = time_period.get('num_days', 1)
         
+        # Amounts are in cents
         return {
-            'total_income': float(total_income),
-            'total_expenses': float(total_expenses),
-            'net_savings': float(total_income - total_expenses),
-            'savings_rate': float((total_income - total_expenses) / total_income * 100) 
+            'total_income': total_income / 100,
+            'total_expenses': total_expenses / 100,
+            'net_savings': (total_income - total_expenses) / 100,
+            'savings_rate': (total_income - total_expenses) * 100 / total_income 
                            if total_income > 0 else 0.0,
-            'avg_daily_spending': float(total_expenses / Decimal(str(max(1, num_days))))
+            'avg_daily_spending': total_expenses / (100 * max(1, num_days))
         }
     
     def _analyze_by_category(self) -> List[Dict]:
         """Analyze spending by category"""
-        category_data = defaultdict(lambda: {'total': Decimal('0'), 'count': 0, 'transactions': []})
-        
-        for t in self.transactions:
-            if t['type'] == 'expense':
-                cat = t.get('category_id', 'uncategorized')
-                category_data[cat]['total'] += Decimal(str(t['amount']))
-                category_data[cat]['count'] += 1
-                category_data[cat]['transactions'].append(t)
-        
-        total_expenses = sum(c['total'] for c in category_data.values())
+        total_expenses = self.aggregates.total_expenses
         
         result = []
-        for cat, data in category_data.items():
+        for cat, (total, count, largest) in self.aggregates.expenses_by_category.items():
             result.append({
                 'category': str(cat),
-                'total_spent': float(data['total']),
-                'num_transactions': int(data['count']),
-                'percentage_of_total': float((data['total'] / total_expenses * 100) 
+                'total_spent': total / 100,
+                'num_transactions': int(count),
+                'percentage_of_total': float((total * 100 / total_expenses) 
                                       if total_expenses > 0 else 0),
-                'avg_transaction': float(data['total'] / Decimal(str(data['count'])) if data['count'] > 0 else 0),
-                'largest_transaction': float(max((Decimal(str(t['amount'])) for t in data['transactions']), default=0))
+                'avg_transaction': total / (100 * count),
+                'largest_transaction': largest / 100
             })
         
         return sorted(result, key=lambda x: x['total_spent'], reverse=True)
     
     def _analyze_income(self) -> Dict:
         """Analyze income sources and patterns"""
-        income_txns = [t for t in self.transactions if t['type'] == 'income']
+        agg = self.aggregates
         
-        if not income_txns:
+        if not agg.num_income:
             return {}
         
-        income_by_category = defaultdict(lambda: Decimal('0'))
-        for t in income_txns:
-            cat = t.get('category_id', 'other')
-            income_by_category[cat] += Decimal(str(t['amount']))
-        
-        largest = max(income_txns, key=lambda x: x['amount'])
+        largest = agg.largest_income
         
         return {
-            'total_income': float(sum(t['amount'] for t in income_txns)),
-            'num_income_transactions': len(income_txns),
-            'avg_income_transaction': float(sum(t['amount'] for t in income_txns) / len(income_txns)),
-            'income_sources': {str(k): float(v) for k, v in income_by_category.items()},
+            'total_income': agg.total_income / 100,
+            'num_income_transactions': agg.num_income,
+            'avg_income_transaction': agg.total_income / (100 * agg.num_income),
+            'income_sources': {str(k): v / 100 for k, v in agg.income_by_category.items()},
             'largest_income': {
-                'amount': float(largest['amount']),
-                'date': str(largest['date']),
-                'category': str(largest.get('category_id', 'unknown'))
+                'amount': largest['amount'],
+                'date': largest['date'],
+                'category': largest['category']
             }
         }
     
     def _detect_spending_patterns(self) -> Dict:
         """Detect temporal and behavioral spending patterns"""
-        expense_txns = [t for t in self.transactions if t['type'] == 'expense']
+        agg = self.aggregates
         
-        if not expense_txns:
+        if not agg.num_expenses:
             return {}
         
-        # Group by day of week
-        by_day = defaultdict(list)
-        for t in expense_txns:
-            dt = self._parse_date(t['date'])
-            by_day[dt.strftime('%A')].append(float(t['amount']))
+        by_day = {
+            DAY_NAMES[weekday]: {
+                'total': total / 100,
+                'avg': total / (100 * count),
+                'count': count
+            } for weekday, (total, count) in agg.expenses_by_weekday.items()
+        }
         
-        # Spending velocity (frequency patterns)
-        dates = sorted([self._parse_date(t['date']) for t in expense_txns])
-        intervals = [(dates[i+1] - dates[i]).days for i in range(len(dates)-1)]
-        avg_days_between = sum(intervals) / len(intervals) if intervals else 0
-
-        if not by_day:
-            return {}
+        # Spending velocity (frequency patterns): the gaps between consecutive
+        # expense dates add up to the span from the first to the last one
+        if agg.num_expenses > 1:
+            span = max(agg.expenses_by_day) - min(agg.expenses_by_day)
+            avg_days_between = span / (agg.num_expenses - 1)
+        else:
+            avg_days_between = 0
         
         return {
-            'spending_by_day': {day: {
-                'total': float(sum(amounts)),
-                'avg': float(sum(amounts) / len(amounts)),
-                'count': len(amounts)
-            } for day, amounts in by_day.items()},
-            'most_active_day': max(by_day.items(), key=lambda x: len(x[1]))[0] 
-                              if by_day else None,
+            'spending_by_day': by_day,
+            'most_active_day': max(by_day.items(), key=lambda x: x[1]['count'])[0],
             'avg_days_between_transactions': float(avg_days_between),
             'spending_frequency': 'high' if avg_days_between < 1 
                                  else 'moderate' if avg_days_between < 3 
@@ -220,36 +245,34 @@ class FinancialDataProcessor:
     
     def _calculate_trend(self) -> str:
         """Calculate spending trend over time"""
-        expense_txns = [t for t in self.transactions if t['type'] == 'expense']
+        by_day = self.aggregates.expenses_by_day
         
-        if len(expense_txns) < 2:
+        if self.aggregates.num_expenses < 2:
             return 'insufficient_data'
         
-        sorted_txns = sorted(expense_txns, 
-                            key=lambda x: self._parse_date(x['date']))
-        
-        # Find midpoint date
-        first_date = self._parse_date(sorted_txns[0]['date'])
-        last_date = self._parse_date(sorted_txns[-1]['date'])
-        mid_date = first_date + (last_date - first_date) / 2
+        # Find midpoint: the first day on or after the middle of the range
+        first_day = min(by_day)
+        last_day = max(by_day)
+        span = last_day - first_day
+        mid_day = first_day + (span + 1) // 2
         
         # Split by date
-        first_half = [t for t in sorted_txns if self._parse_date(t['date']) < mid_date]
-        second_half = [t for t in sorted_txns if self._parse_date(t['date']) >= mid_date]
+        first_half = [total for day, total in by_day.items() if day < mid_day]
+        second_half = [total for day, total in by_day.items() if day >= mid_day]
         
         if not first_half or not second_half:
             return 'insufficient_data'
         
-        # Calculate days in each period
-        first_days = (mid_date - first_date).days or 1
-        second_days = (last_date - mid_date).days or 1
+        # Calculate whole days in each period
+        first_days = span // 2 or 1
+        second_days = (span - (span + 1) // 2) or 1
         
         # Normalize by daily spending rate
-        first_total = sum(Decimal(str(t['amount'])) for t in first_half)
-        second_total = sum(Decimal(str(t['amount'])) for t in second_half)
+        first_total = sum(first_half)
+        second_total = sum(second_half)
         
-        first_daily = float(first_total / Decimal(str(first_days)))
-        second_daily = float(second_total / Decimal(str(second_days)))
+        first_daily = first_total / (100 * first_days)
+        second_daily = second_total / (100 * second_days)
         
         if second_daily > first_daily * 1.1:
             return 'increasing'
@@ -260,35 +283,30 @@ class FinancialDataProcessor:
     
     def _detect_anomalies(self) -> List[Dict]:
         """Detect unusual transactions"""
-        expense_txns = [t for t in self.transactions if t['type'] == 'expense']
+        agg = self.aggregates
         
-        if len(expense_txns) < 3:
+        if agg.num_expenses < 3:
             return []
         
-        amounts = [float(t['amount']) for t in expense_txns]
-        avg = sum(amounts) / len(amounts)
-        std = (sum((x - avg) ** 2 for x in amounts) / (len(amounts) - 1)) ** 0.5 if len(amounts) > 1 else 0
+        avg, std = agg.expense_mean_and_std()
 
         # If std is 0 or near-zero, all amounts are identical - no anomalies
         if std < 0.01:
             return []
         
+        # Only the largest expenses can be above the threshold, and they
+        # come out already ordered by deviation
         anomalies = []
-        for t in expense_txns:
-            amount = float(t['amount'])
+        for _, t in agg.top_expenses():
+            amount = t['amount']
             if amount > avg + 2 * std:
                 anomalies.append({
-                    'transaction': {
-                        'amount': float(t['amount']),
-                        'date': str(t['date']),
-                        'description': str(t.get('description', 'No description')),
-                        'category': str(t.get('category_id', 'unknown'))
-                    },
+                    'transaction': dict(t),
                     'reason': 'unusually_high',
-                    'deviation': float((amount - avg) / std) if std > 0 else 0
+                    'deviation': float((amount - avg) / std)
                 })
         
-        return sorted(anomalies, key=lambda x: x['deviation'], reverse=True)[:5]
+        return anomalies
     
     def _identify_milestones(self) -> List[Dict]:
         """Identify positive financial milestones"""
@@ -345,4 +363,4 @@ class FinancialDataProcessor:
         elif trend == 'increasing':
             insights.append("Your spending has been trending upward recently")
         
-        return insights
\ No newline at end of file
+        return insights
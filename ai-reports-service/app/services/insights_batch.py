@@ -0,0 +1,85 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from app.core.async_database import async_db, AsyncDatabaseManager
+from app.services.insights_workers import insights_workers, InsightsWorkerPool, pack_rows, process_user_rows
+
+
+class InsightsBatch:
+    """
+    Insights for many users at once (e.g. the monthly digest)
+    All users' transactions are read in one query, grouped by user; each
+    user's rows are handed to the worker pool as soon as the stream moves
+    past them, so users are processed in parallel while the rest is read.
+    """
+
+    def __init__(self, database: AsyncDatabaseManager, workers: InsightsWorkerPool):
+        self.db = database
+        self.workers = workers
+
+        # Monitoring counters
+        self.batches = 0
+        self.users = 0
+
+    async def run(
+        self,
+        user_ids: List[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Tuple[Dict[str, Dict], List[str]]:
+        """
+        Processed insights and metadata per user, like /insights returns
+        Returns (results by user id in request order, users without transactions)
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        results = {}
+        tasks = []
+
+        # At most two users per worker in flight; the stream waits for a
+        # slot, so a large batch never has every user's rows in memory
+        slots = asyncio.Semaphore(self.workers.num_workers * 2)
+
+        async def process(user_id: str, rows: List[Tuple]):
+            try:
+                results[user_id] = await self.workers.run(process_user_rows, user_id, pack_rows(rows))
+            finally:
+                slots.release()
+
+        async def submit(user_id: str, rows: List[Tuple]):
+            await slots.acquire()
+            tasks.append(asyncio.create_task(process(user_id, rows)))
+
+        stream = self.db.iter_transaction_rows_by_users(user_ids, start_date, end_date)
+        try:
+            current, rows = None, []
+            async for user_id, row in stream:
+                if user_id != current:
+                    if rows:
+                        await submit(current, rows)
+                    current, rows = user_id, []
+                rows.append(row)
+            if rows:
+                await submit(current, rows)
+
+            await asyncio.gather(*tasks)
+        finally:
+            # Closes the cursor now, rather than whenever the stream is collected
+            await stream.aclose()
+            for task in tasks:
+                task.cancel()
+
+        self.batches += 1
+        self.users += len(results)
+
+        missing = [user_id for user_id in user_ids if user_id not in results]
+        return {user_id: results[user_id] for user_id in user_ids if user_id in results}, missing
+
+    def stats(self) -> Dict:
+        return {
+            'batches': self.batches,
+            'users': self.users,
+            'workers': self.workers.stats()
+        }
+
+
+# Global batch runner
+insights_batch = InsightsBatch(async_db, insights_workers)
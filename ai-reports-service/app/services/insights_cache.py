@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+# (transaction count, latest updated_at) of the requested range
+Watermark = Tuple[int, Optional[datetime]]
+
+
+class InsightsCache:
+    """
+    Memoizes processed insights per (user_id, start_date, end_date)
+    An entry is only served while the range's transaction watermark still
+    matches the one it was computed at, so any insert, update or delete in
+    the range invalidates it. Holds at most INSIGHTS_CACHE_MAX_ENTRIES
+    entries, evicting the least recently used.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or settings.INSIGHTS_CACHE_MAX_ENTRIES
+        self._entries: OrderedDict = OrderedDict()
+
+        # Monitoring counters
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Tuple, watermark: Watermark) -> Optional[Dict]:
+        """Cached result for key if it was computed at this watermark"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        if entry[0] != watermark:
+            del self._entries[key]
+            self.invalidations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Tuple, watermark: Watermark, result: Dict):
+        self._entries[key] = (watermark, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': settings.INSIGHTS_CACHE_ENABLED,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations
+        }
+
+
+# Global insights cache
+insights_cache = InsightsCache()
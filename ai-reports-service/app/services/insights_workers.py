@@ -0,0 +1,157 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+from app.core import queries
+from app.core.money import Money
+from app.core.records import Transaction
+from app.services.aggregates import TransactionAggregates
+from app.services.data_processor import FinancialDataProcessor
+
+
+def _shared(values: Sequence) -> Tuple:
+    """values with equal ones replaced by the same object, which pickle writes only once"""
+    seen = {}
+    return tuple(map(seen.setdefault, values, values))
+
+
+def pack_rows(rows: List[Tuple]) -> Tuple:
+    """
+    Columnar form of transaction rows (TRANSACTION_COLUMNS order) for a worker
+    Numbers and dates go into arrays and repeated strings are shared, so
+    pickling it costs a fraction of pickling the row tuples.
+    """
+    types, cents, category_ids, descriptions, dates = zip(*rows)
+    return (
+        _shared(types),
+        array('q', cents),
+        array('i', category_ids),
+        _shared(descriptions),
+        array('i', map(date.toordinal, dates))
+    )
+
+
+def unpack_rows(packed: Tuple) -> List[Tuple]:
+    """Transaction rows back from pack_rows"""
+    types, cents, category_ids, descriptions, days = packed
+    return list(zip(types, cents, category_ids, descriptions, map(date.fromordinal, days)))
+
+
+def pack_transactions(transactions: Sequence[Transaction]) -> Tuple:
+    """
+    Columnar form of Transaction records for a worker, like pack_rows
+    Raises TypeError or AttributeError for anything else, e.g. dicts or
+    dates that are still strings
+    """
+    return (
+        _shared(tuple(map(attrgetter('type'), transactions))),
+        array('q', map(attrgetter('amount.cents'), transactions)),
+        tuple(map(attrgetter('category_id'), transactions)),  # names, already shared with the category table
+        _shared(tuple(map(attrgetter('description'), transactions))),
+        array('i', map(date.toordinal, map(attrgetter('date'), transactions)))
+    )
+
+
+def unpack_transactions(packed: Tuple) -> List[Transaction]:
+    """Transaction records back from pack_transactions"""
+    types, cents, categories, descriptions, days = packed
+    return list(map(Transaction, types, map(Money, cents), categories, descriptions, map(date.fromordinal, days)))
+
+
+def process_transactions(
+    packed: Tuple,
+    user_profile: Dict,
+    snapshots: List[TransactionAggregates]
+) -> Tuple[Dict, int]:
+    """
+    (insights, number of transactions) for packed records (runs in a worker process)
+    """
+    processor = FinancialDataProcessor(unpack_transactions(packed), user_profile, snapshots)
+    return processor.process(), processor.aggregates.num_transactions
+
+
+def process_user_rows(user_id: str, packed: Tuple) -> Dict:
+    """
+    Insights for one user's transaction rows (runs in a worker process)
+    packed is pack_rows() of the rows as read from the database, so
+    converting them to records happens in the worker too
+    """
+    transactions = [queries.transaction_from_row(row) for row in unpack_rows(packed)]
+    processor = FinancialDataProcessor(transactions, {'user_id': user_id})
+
+    return {
+        'processed_insights': processor.process(),
+        'metadata': {
+            'user_id': user_id,
+            'generated_at': datetime.now().isoformat(),
+            'num_transactions': processor.aggregates.num_transactions
+        }
+    }
+
+
+class InsightsWorkerPool:
+    """
+    Process pool for CPU-bound insights computation
+    Pure-Python processing holds the GIL, so it runs in separate processes to
+    use every core and keep the event loop free. Workers are spawned (not
+    forked from the threaded server) on first use and kept for later calls.
+    """
+
+    def __init__(self, workers: int = None):
+        self.num_workers = workers or settings.INSIGHTS_WORKERS or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # Monitoring counters
+        self.submitted = 0
+        self.failed = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) in a worker process; fn and its arguments must be picklable"""
+        executor = self._get_executor()
+        self.submitted += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a new pool next time
+            self.failed += 1
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    def shutdown(self):
+        """Stop the worker processes (on application shutdown)"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.num_workers,
+            'started': self._executor is not None,
+            'submitted': self.submitted,
+            'failed': self.failed
+        }
+
+
+# Global worker pool
+insights_workers = InsightsWorkerPool()
@@ -0,0 +1,100 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.async_database import async_db, AsyncDatabaseManager
+
+
+def prompt_key(model_name: str, prompt: str) -> str:
+    """Content address of a generation: hash of the model name and the prompt"""
+    return hashlib.sha256(f"{model_name}\0{prompt}".encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Caches generated reports by prompt hash
+    The prompt is built deterministically from the insights, so regenerating
+    a report over unchanged data finds the earlier answer. Lookups go to an
+    in-process LRU first, then to the ai_llm_cache table (migrations/002);
+    both tiers expire entries after LLM_CACHE_TTL_SECONDS and are capped in size.
+    """
+
+    def __init__(
+        self,
+        database: AsyncDatabaseManager,
+        max_entries: int = None,
+        max_persistent_entries: int = None,
+        ttl: float = None
+    ):
+        self.db = database
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.max_persistent_entries = max_persistent_entries or settings.LLM_CACHE_PERSISTENT_MAX_ENTRIES
+        self.ttl = ttl or settings.LLM_CACHE_TTL_SECONDS
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+
+        # Monitoring counters
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    async def get(self, model_name: str, prompt: str) -> Optional[str]:
+        """Cached report text for this prompt, or None"""
+        key = prompt_key(model_name, prompt)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, text = entry
+            if time.time() - stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return text
+            del self._entries[key]
+
+        try:
+            row = await self.db.get_cached_llm_response(key, self.ttl)
+        except Exception as e:
+            print(f"⚠️  LLM cache lookup failed: {e}")
+            row = None
+
+        if row is not None:
+            self._remember(key, row['response'], row['created_at'].timestamp())
+            self.persistent_hits += 1
+            return row['response']
+
+        self.misses += 1
+        return None
+
+    async def set(self, model_name: str, prompt: str, text: str):
+        """Store a freshly generated report in both tiers"""
+        key = prompt_key(model_name, prompt)
+        self._remember(key, text, time.time())
+
+        try:
+            await self.db.save_cached_llm_response(key, model_name, text, self.ttl, self.max_persistent_entries)
+        except Exception as e:
+            print(f"⚠️  LLM cache write failed: {e}")
+
+    def _remember(self, key: str, text: str, stored_at: float):
+        self._entries[key] = (stored_at, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """Hit/miss counts; every hit is a Gemini call saved"""
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            'enabled': settings.LLM_CACHE_ENABLED,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'persistent_hits': self.persistent_hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'hit_rate': round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0
+        }
+
+
+# Global LLM response cache
+llm_cache = LLMResponseCache(async_db)
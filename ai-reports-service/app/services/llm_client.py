@@ -0,0 +1,139 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional
+import google.generativeai as genai
+from app.core.config import settings
+from app.core.metrics import STAGE_SECONDS, LLM_REQUESTS
+
+
+class LLMTimeoutError(Exception):
+    """Raised when the model doesn't answer within the request timeout"""
+
+
+class LLMClient:
+    """
+    Non-blocking access to Gemini with a global concurrency cap
+    At most LLM_MAX_CONCURRENCY generations run at once; further requests
+    queue for a slot. Uses the async client API, or a bounded thread pool
+    when the installed SDK doesn't have one.
+    """
+
+    def __init__(self, max_concurrency: int = None, timeout: float = None):
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        self.timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='llm')
+        self._configured = False
+
+        # Monitoring counters
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.timeouts = 0
+        LLM_REQUESTS.set_function(lambda: self.in_flight, state='in_flight')
+        LLM_REQUESTS.set_function(lambda: self.waiting, state='queued')
+
+    def get_model(self, model_name: str):
+        """Configure the SDK once and return a model handle"""
+        if not self._configured:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            self._configured = True
+        return genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str, model_name: str, timeout: Optional[float] = None) -> str:
+        """
+        Generate text for a prompt
+        The timeout covers both waiting for a slot and the call itself
+        """
+        try:
+            with STAGE_SECONDS.time(stage='llm'):
+                return await asyncio.wait_for(self._generate(prompt, model_name), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeoutError(f"LLM did not respond within {timeout or self.timeout:.0f}s")
+
+    async def _generate(self, prompt: str, model_name: str) -> str:
+        await self._acquire()
+        try:
+            model = self.get_model(model_name)
+            if hasattr(model, 'generate_content_async'):
+                response = await model.generate_content_async(prompt)
+            else:
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(self._executor, model.generate_content, prompt)
+            self.completed += 1
+            return response.text
+        finally:
+            self._release()
+
+    async def stream(self, prompt: str, model_name: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Yield the generated text in chunks as the model produces them
+        The slot is held until the stream ends; the timeout bounds the whole stream
+        """
+        timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + timeout
+
+        def remaining() -> float:
+            return max(deadline - loop.time(), 0)
+
+        try:
+            await asyncio.wait_for(self._acquire(), remaining())
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeoutError(f"LLM did not respond within {timeout:.0f}s")
+
+        try:
+            model = self.get_model(model_name)
+            if hasattr(model, 'generate_content_async'):
+                response = await asyncio.wait_for(model.generate_content_async(prompt, stream=True), remaining())
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), remaining())
+                    except StopAsyncIteration:
+                        break
+                    yield chunk.text
+            else:
+                # No async streaming in this SDK: the whole text arrives as one chunk
+                response = await asyncio.wait_for(
+                    loop.run_in_executor(self._executor, model.generate_content, prompt),
+                    remaining()
+                )
+                yield response.text
+            self.completed += 1
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise LLMTimeoutError(f"LLM did not respond within {timeout:.0f}s")
+        finally:
+            self._release()
+            STAGE_SECONDS.observe(loop.time() - started, stage='llm')
+
+    async def _acquire(self):
+        """Wait for a free slot"""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self) -> Dict:
+        """Current load, including the number of requests queued for a slot"""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'queue_depth': self.waiting,
+            'completed': self.completed,
+            'timeouts': self.timeouts
+        }
+
+
+# Global LLM client shared by all requests
+llm_client = LLMClient()
@@ -1,58 +1,170 @@
 # app/services/report_generator.py
 
 from datetime import datetime
-from typing import List, Dict, Any
-import google.generativeai as genai
+from typing import List, Dict, Any, Iterable, Union
+from app.core.records import Transaction
+from app.services.aggregates import TransactionAggregates
 from app.services.data_processor import FinancialDataProcessor
 from app.services.prompt_builder import PromptBuilder
+from app.services.llm_client import llm_client
+from app.services.llm_cache import llm_cache
 from app.core.config import settings
+from app.core.metrics import STAGE_SECONDS
+from app.core import profiling
+from app.core.serialization import SerializedDict
+from app.services.insights_workers import insights_workers, pack_transactions, process_transactions
 
 
 class ReportGenerator:
     """Orchestrates the entire report generation process"""
     
-    def __init__(self, transactions: List[Dict], user_profile: Dict = None):
+    def __init__(
+        self,
+        transactions: Iterable[Union[Transaction, Dict]],
+        user_profile: Dict = None,
+        snapshots: List[TransactionAggregates] = None
+    ):
         self.transactions = transactions
         self.user_profile = user_profile or {}
+        self.snapshots = snapshots or []
+        self._report_package = None
+
+        if settings.INSIGHTS_EXECUTION not in ('inline', 'process'):
+            raise ValueError(f"Unknown insights execution mode: {settings.INSIGHTS_EXECUTION}")
     
     def generate(self) -> Dict[str, Any]:
-        """Generate the complete report package"""
+        """
+        Generate the complete report package
+        Computed once: transactions may be a one-shot iterator, so later
+        calls (e.g. from generate_with_llm_async) return the same package
+        """
+        
+        if self._report_package is not None:
+            return self._report_package
         
         # Step 1: Process data
-        processor = FinancialDataProcessor(self.transactions, self.user_profile)
-        insights = processor.process()
+        with STAGE_SECONDS.time(stage='process'), profiling.section():
+            processor = FinancialDataProcessor(self.transactions, self.user_profile, self.snapshots)
+            insights = processor.process()
+        
+        return self._package(insights, processor.aggregates.num_transactions)
+    
+    async def generate_async(self) -> Dict[str, Any]:
+        """
+        generate() that computes large inputs in the worker pool
+        With INSIGHTS_EXECUTION=process, transaction lists of at least
+        INSIGHTS_PROCESS_MIN_TRANSACTIONS records are shipped to a worker
+        process, so processing uses another core instead of blocking the
+        event loop; smaller ones are processed inline
+        """
+        
+        if self._report_package is not None:
+            return self._report_package
+        
+        packed = self._pack_for_worker()
+        if packed is None:
+            return self.generate()
+        
+        with STAGE_SECONDS.time(stage='process'):
+            insights, num_transactions = await insights_workers.run(
+                process_transactions, packed, self.user_profile, self.snapshots
+            )
+        
+        return self._package(insights, num_transactions)
+    
+    def _pack_for_worker(self):
+        """Packed transactions if they should be processed in a worker, else None"""
+        if settings.INSIGHTS_EXECUTION != 'process' or not isinstance(self.transactions, list):
+            return None
+        if len(self.transactions) < settings.INSIGHTS_PROCESS_MIN_TRANSACTIONS:
+            return None
+        try:
+            return pack_transactions(self.transactions)
+        except (TypeError, AttributeError):
+            # e.g. dicts from a caller; processed inline
+            return None
+    
+    def _package(self, insights: Dict, num_transactions: int) -> Dict[str, Any]:
+        """Prompt and report package for processed insights"""
+        profiling.tag(rows=num_transactions)
         
         # Step 2: Build prompt
-        prompt_builder = PromptBuilder(insights, self.user_profile)
-        llm_prompt = prompt_builder.build_prompt()
+        with STAGE_SECONDS.time(stage='build_prompt'), profiling.section():
+            prompt_builder = PromptBuilder(insights, self.user_profile)
+            llm_prompt = prompt_builder.build_prompt()
         
-        # Step 3: Return package for LLM
-        return {
-            'processed_insights': insights,
+        # Step 3: Return package for LLM; the insights are JSON-encoded at
+        # most once, for both the saved report and the response
+        self._report_package = {
+            'processed_insights': SerializedDict(insights),
             'llm_prompt': llm_prompt,
             'metadata': {
                 'user_id': self.user_profile.get('user_id'),
                 'generated_at': datetime.now().isoformat(),
-                'num_transactions': len(self.transactions)
+                'num_transactions': num_transactions
             }
         }
+        return self._report_package
     
-    def generate_with_llm(self, model_name: str = "gemini-2.5-flash"):
+    async def generate_with_llm_async(
+        self,
+        model_name: str = "gemini-2.5-flash",
+        timeout: float = None,
+        use_cache: bool = True
+    ):
         """
-        Generate report using Gemini LLM
+        Generate report using Gemini LLM without blocking the event loop
+        Shares the global concurrency cap; raises LLMTimeoutError on timeout.
+        Identical prompts are answered from the response cache unless use_cache is False.
         """
         
-        report_package = self.generate()
-        
-        # Configure Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        model = genai.GenerativeModel(model_name)
+        report_package = await self.generate_async()
+        prompt = report_package['llm_prompt']
         
-        # Call Gemini API
-        response = model.generate_content(report_package['llm_prompt'])
+        ai_report = await self._cached_report(model_name, prompt, use_cache)
+        if ai_report is None:
+            ai_report = await llm_client.generate(prompt, model_name, timeout)
+            if settings.LLM_CACHE_ENABLED:
+                await llm_cache.set(model_name, prompt, ai_report)
         
         return {
             **report_package,
-            'ai_report': response.text,
+            'ai_report': ai_report,
             'model_used': model_name
-        }
\ No newline at end of file
+        }
+    
+    def stream_with_llm(self, model_name: str = "gemini-2.5-flash", timeout: float = None, use_cache: bool = True):
+        """
+        Streaming variant of generate_with_llm_async
+        Returns the report package right away, together with an async
+        iterator over the report text as Gemini produces it
+        """
+        
+        report_package = self.generate()
+        
+        chunks = self._stream_report(report_package['llm_prompt'], model_name, timeout, use_cache)
+        
+        return {**report_package, 'model_used': model_name}, chunks
+    
+    async def _stream_report(self, prompt: str, model_name: str, timeout: float, use_cache: bool):
+        """Cached report as a single chunk, or the live stream (cached once complete)"""
+        ai_report = await self._cached_report(model_name, prompt, use_cache)
+        if ai_report is not None:
+            yield ai_report
+            return
+        
+        chunks = []
+        async for text in llm_client.stream(prompt, model_name, timeout):
+            chunks.append(text)
+            yield text
+        
+        if settings.LLM_CACHE_ENABLED:
+            await llm_cache.set(model_name, prompt, ''.join(chunks))
+    
+    async def _cached_report(self, model_name: str, prompt: str, use_cache: bool):
+        if not settings.LLM_CACHE_ENABLED:
+            return None
+        if not use_cache:
+            llm_cache.bypassed += 1
+            return None
+        return await llm_cache.get(model_name, prompt)
@@ -0,0 +1,105 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.async_database import async_db, AsyncDatabaseManager
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many report jobs are already waiting"""
+
+
+class ReportJobQueue:
+    """
+    In-process background queue for report generation
+    Jobs are recorded in ai_report_jobs (migrations/003) and run by a fixed
+    number of worker tasks, so a slow LLM never holds an HTTP request open.
+    A request for a user and date range that already has a pending or running
+    job returns that job instead of queueing a second one.
+    """
+
+    def __init__(self, database: AsyncDatabaseManager, workers: int = None, max_pending: int = None):
+        self.db = database
+        self.num_workers = workers or settings.REPORT_JOB_WORKERS
+        self.max_pending = max_pending or settings.REPORT_JOB_MAX_PENDING
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._submit_lock = asyncio.Lock()
+
+        # Monitoring counters
+        self.submitted = 0
+        self.deduplicated = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker tasks (on application startup, inside the event loop)"""
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+
+    async def stop(self):
+        """Cancel the workers; jobs still queued stay 'pending' and expire"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(
+        self,
+        user_id: str,
+        start_date: Optional[str],
+        end_date: Optional[str],
+        run: Callable[[], Awaitable[Dict]]
+    ) -> Tuple[Dict, bool]:
+        """
+        Queue run() as a job, unless an identical one is already active
+        Returns (job, deduplicated)
+        """
+        async with self._submit_lock:
+            job = await self.db.get_active_report_job(
+                user_id, start_date, end_date, settings.REPORT_JOB_STALE_SECONDS
+            )
+            if job is not None:
+                self.deduplicated += 1
+                return job, True
+
+            if self._queue.full():
+                raise JobQueueFullError("Too many reports are being generated, try again shortly")
+
+            job = await self.db.create_report_job(user_id, start_date, end_date)
+            self._queue.put_nowait((job['id'], run))
+            self.submitted += 1
+            return job, False
+
+    async def _worker(self):
+        while True:
+            job_id, run = await self._queue.get()
+            try:
+                await self.db.update_report_job(job_id, 'running')
+                result = await run()
+                await self.db.update_report_job(job_id, 'done', result=result)
+                self.succeeded += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                detail = getattr(e, 'detail', None) or str(e)
+                try:
+                    await self.db.update_report_job(job_id, 'failed', error=detail)
+                except Exception as db_error:
+                    print(f"⚠️  Could not record failure of report job {job_id}: {db_error}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict:
+        return {
+            'workers': self.num_workers,
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'submitted': self.submitted,
+            'deduplicated': self.deduplicated,
+            'succeeded': self.succeeded,
+            'failed': self.failed
+        }
+
+
+# Global report job queue, started on application startup
+report_jobs = ReportJobQueue(async_db)
@@ -0,0 +1,84 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+from app.core.async_database import async_db, AsyncDatabaseManager
+from app.services.aggregates import TransactionAggregates
+from app.services.data_processor import FinancialDataProcessor
+
+
+def _month_end(month: date) -> date:
+    """Last day of the month starting at month"""
+    return (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+class InsightSnapshotStore:
+    """
+    Keeps per-user monthly aggregate snapshots next to ai_reports
+    Months that lie entirely inside the requested range and haven't changed
+    since their snapshot was saved are served from it; only the remaining
+    months are fetched and processed, and the complete ones are snapshotted
+    for next time. Every month ends up as one set of aggregates, merged in
+    the order a full recompute reads the rows (date DESC), so ties come out
+    the same.
+    """
+
+    def __init__(self, database: AsyncDatabaseManager):
+        self.db = database
+
+    def _covers_month(self, month: date, start_date: Optional[str], end_date: Optional[str]) -> bool:
+        """Whether the requested range includes the whole month"""
+        if start_date and date.fromisoformat(start_date[:10]) > month:
+            return False
+        if end_date and date.fromisoformat(end_date[:10]) < _month_end(month):
+            return False
+        return True
+
+    async def load(
+        self,
+        user_id: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Tuple[List, List[TransactionAggregates]]:
+        """
+        Returns ([], aggregates of each month in the range, newest month first),
+        like the SQL aggregate mode; nothing is left to process row by row
+        """
+        watermarks = await self.db.get_monthly_watermarks(user_id, start_date, end_date)
+        if not watermarks:
+            return [], []
+
+        whole_months = [m for m in watermarks if self._covers_month(m, start_date, end_date)]
+        saved = await self.db.get_insight_snapshots(user_id, whole_months) if whole_months else {}
+
+        stale = {m for m in whole_months if m not in saved}
+        fetch = sorted(m for m in watermarks if m not in saved)
+
+        # Rows come in date DESC, id order, so each month's stay in that order
+        rows = defaultdict(list)
+        if fetch:
+            for t in await self.db.get_transactions_by_user(user_id, start_date, end_date, months=fetch):
+                rows[t.date.replace(day=1)].append(t)
+
+        months = {month: TransactionAggregates.from_dict(data) for month, data in saved.items()}
+        new_snapshots = []
+        for month in fetch:
+            # Partial months at the edges of the range are aggregated too, but not saved
+            months[month] = FinancialDataProcessor(rows[month]).aggregates
+            if month not in stale:
+                continue
+            new_snapshots.append({
+                'month': month,
+                'num_transactions': watermarks[month]['num_transactions'],
+                'last_updated_at': watermarks[month]['last_updated_at'],
+                'aggregates': months[month].to_dict()
+            })
+
+        await self.db.save_insight_snapshots(user_id, new_snapshots)
+
+        # Merging newest month first counts each month's rows as coming after
+        # the newer ones', which is where a full recompute reads them
+        return [], [months[m] for m in sorted(months, reverse=True)]
+
+
+# Global snapshot store
+snapshot_store = InsightSnapshotStore(async_db)
@@ -0,0 +1,183 @@
+"""
+Benchmark the reporting pipeline on synthetic transactions
+
+Times FinancialDataProcessor section by section, then the prompt build and
+JSON serialization of processed_insights, and measures peak memory. No
+database or API key is needed.
+
+    python benchmarks/run.py [--sizes 1000,10000,100000,1000000] [--repeat 3]
+                             [--output results.json]
+                             [--baseline old.json] [--threshold 1.25]
+
+Results are written as JSON (stdout by default) with a summary on stderr.
+With --baseline, exits with status 1 if any stage got slower than
+threshold x its baseline median.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import serialization
+from app.services.data_processor import FinancialDataProcessor
+from app.services.prompt_builder import PromptBuilder
+from synthetic import generate_transactions
+
+# FinancialDataProcessor.process() sections, in pipeline order
+SECTIONS = [
+    ('time_period', '_get_time_period'),
+    ('summary', '_calculate_summary'),
+    ('spending_by_category', '_analyze_by_category'),
+    ('income_analysis', '_analyze_income'),
+    ('spending_patterns', '_detect_spending_patterns'),
+    ('comparisons', '_calculate_comparisons'),
+    ('anomalies', '_detect_anomalies'),
+    ('milestones', '_identify_milestones'),
+    ('behavioral_insights', '_extract_behavioral_insights'),
+]
+
+# Baseline medians below this are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.001
+
+
+def run_pipeline(transactions):
+    """One pass of the pipeline; returns {stage: seconds}"""
+    timings = {}
+
+    start = time.perf_counter()
+    processor = FinancialDataProcessor(transactions)
+    timings['aggregate'] = time.perf_counter() - start
+
+    for name, method in SECTIONS:
+        section_start = time.perf_counter()
+        processor.insights[name] = getattr(processor, method)()
+        timings[f"section.{name}"] = time.perf_counter() - section_start
+
+    timings['process_total'] = time.perf_counter() - start
+    insights = processor.insights
+
+    stage_start = time.perf_counter()
+    PromptBuilder(insights).build_prompt()
+    timings['build_prompt'] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    serialization.dumps(insights)
+    timings['serialize_insights'] = time.perf_counter() - stage_start
+
+    return timings
+
+
+def peak_memory(transactions) -> int:
+    """Peak bytes allocated by the pipeline, on top of the input rows"""
+    tracemalloc.start()
+    try:
+        processor = FinancialDataProcessor(transactions)
+        insights = processor.process()
+        PromptBuilder(insights).build_prompt()
+        serialization.dumps(insights)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(rows: int, repeat: int, seed: int):
+    transactions = generate_transactions(rows, seed)
+
+    runs = [run_pipeline(transactions) for _ in range(repeat)]
+    stages = {
+        stage: {
+            'min': min(run[stage] for run in runs),
+            'median': statistics.median(run[stage] for run in runs)
+        }
+        for stage in runs[0]
+    }
+
+    return {
+        'rows': rows,
+        'repeat': repeat,
+        'stages': stages,
+        'throughput_rows_per_sec': rows / stages['process_total']['median'],
+        'peak_memory_bytes': peak_memory(transactions)
+    }
+
+
+def find_regressions(results, baseline, threshold):
+    """Stages whose median grew by more than threshold x the baseline's"""
+    previous = {r['rows']: r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(result['rows'])
+        if old is None:
+            continue
+        for stage, timing in result['stages'].items():
+            old_median = old['stages'].get(stage, {}).get('median')
+            if old_median and old_median >= MIN_COMPARABLE_SECONDS and timing['median'] > old_median * threshold:
+                regressions.append({
+                    'rows': result['rows'],
+                    'stage': stage,
+                    'baseline_median': old_median,
+                    'median': timing['median'],
+                    'ratio': timing['median'] / old_median
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000,1000000', help="Comma-separated row counts")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per size")
+    parser.add_argument('--seed', type=int, default=0, help="Synthetic data seed")
+    parser.add_argument('--output', help="Write JSON results here instead of stdout")
+    parser.add_argument('--baseline', help="Earlier results to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    results = []
+    for rows in (int(size) for size in args.sizes.split(',')):
+        result = benchmark(rows, args.repeat, args.seed)
+        results.append(result)
+        print(
+            f"{rows:>9,} rows  "
+            f"process {result['stages']['process_total']['median'] * 1000:9.1f} ms  "
+            f"prompt {result['stages']['build_prompt']['median'] * 1000:7.2f} ms  "
+            f"json {result['stages']['serialize_insights']['median'] * 1000:7.2f} ms  "
+            f"{result['throughput_rows_per_sec']:12,.0f} rows/s  "
+            f"peak {result['peak_memory_bytes'] / 2**20:8.1f} MiB",
+            file=sys.stderr
+        )
+
+    report = {
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now(timezone.utc).isoformat()
+        },
+        'config': {'seed': args.seed, 'repeat': args.repeat},
+        'results': results
+    }
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['regressions'] = find_regressions(results, json.load(f), args.threshold)
+        for r in report['regressions']:
+            print(f"❌ {r['rows']:,} rows {r['stage']}: {r['ratio']:.2f}x slower", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    sys.exit(1 if report.get('regressions') else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Synthetic transaction sets for benchmarks
+
+Rows are Transaction records like DatabaseManager.get_transactions_by_user
+returns: a monthly salary plus occasional other income, and day-to-day expenses
+spread over the expense categories of app/core/categories.py with
+category-specific amounts. Generation is seeded, so a given (rows, seed)
+always yields the same data.
+"""
+import random
+from datetime import date, timedelta
+from typing import List
+
+from app.core.categories import CATEGORIES, TransactionType
+from app.core.money import Money
+from app.core.records import Transaction
+
+# Typical expense amount (median, spread) per category name; others use the default
+EXPENSE_PROFILES = {
+    'Food & Dining': (18, 0.6),
+    'Transportation': (12, 0.7),
+    'Shopping': (45, 0.9),
+    'Entertainment': (30, 0.8),
+    'Bills & Utilities': (120, 0.4),
+    'Healthcare': (60, 1.0),
+    'Travel': (300, 1.0),
+    'Insurance': (150, 0.3),
+    'Subscriptions': (15, 0.3),
+}
+DEFAULT_PROFILE = (40, 0.8)
+
+# Relative frequency of expense categories
+EXPENSE_WEIGHTS = {
+    'Food & Dining': 30,
+    'Transportation': 15,
+    'Shopping': 12,
+    'Entertainment': 8,
+    'Bills & Utilities': 5,
+    'Subscriptions': 5,
+}
+DEFAULT_WEIGHT = 2
+
+EXPENSE_CATEGORIES = [c.name for c in CATEGORIES.values() if c.type == TransactionType.EXPENSE]
+OTHER_INCOME_CATEGORIES = [
+    c.name for c in CATEGORIES.values() if c.type == TransactionType.INCOME and c.name != 'Salary'
+]
+
+# Expenses per day on average; the date span grows with the row count
+EXPENSES_PER_DAY = 4
+
+
+def generate_transactions(rows: int, seed: int = 0, end: date = date(2025, 1, 1)) -> List[Transaction]:
+    """rows synthetic transactions for one user, newest first"""
+    rng = random.Random(seed)
+    days = max(rows // EXPENSES_PER_DAY, 1)
+    start = end - timedelta(days=days)
+
+    weights = [EXPENSE_WEIGHTS.get(c, DEFAULT_WEIGHT) for c in EXPENSE_CATEGORIES]
+    transactions = []
+
+    def add(kind: str, category: str, amount: Money, when: date, description: str):
+        transactions.append(Transaction(kind, amount, category, description, when))
+
+    # Income: salary on the first of each month, other income now and then
+    salary = Money(rng.randrange(300000, 900000))
+    month = start.replace(day=1)
+    while month <= end and len(transactions) < rows:
+        if month >= start:
+            add('income', 'Salary', salary, month, 'Monthly salary')
+        if rng.random() < 0.3 and len(transactions) < rows:
+            category = rng.choice(OTHER_INCOME_CATEGORIES)
+            amount = Money(int(rng.lognormvariate(6.5, 0.8) * 100))
+            add('income', category, amount, month + timedelta(days=rng.randrange(28)), category)
+        month = (month + timedelta(days=32)).replace(day=1)
+
+    # Expenses fill the rest
+    for category in rng.choices(EXPENSE_CATEGORIES, weights, k=rows - len(transactions)):
+        median, spread = EXPENSE_PROFILES.get(category, DEFAULT_PROFILE)
+        amount = Money(max(int(rng.lognormvariate(0, spread) * median * 100), 1))
+        when = start + timedelta(days=rng.randrange(days + 1))
+        add('expense', category, amount, when, f"{category} purchase")
+
+    # Same order as the transactions query: date DESC, id (sort is stable,
+    # so same-day rows keep their insertion order)
+    transactions.sort(key=lambda t: -t.date.toordinal())
+    return transactions
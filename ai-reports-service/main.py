@@ -1,12 +1,61 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.routing import Match
 from app.core.config import settings
-from app.api.routes import reports
+from app.core.async_database import async_db
+from app.core import metrics, profiling
+from app.services.llm_client import llm_client
+from app.services.llm_cache import llm_cache
+from app.services.insights_cache import insights_cache
+from app.services.report_jobs import report_jobs
+from app.services.single_flight import single_flight
+from app.services.insights_workers import insights_workers
+from app.services.insights_batch import insights_batch
+from app.api.routes import reports, profiles, insights_batch as insights_batch_routes
+
+
+async def warm_up_async_db():
+    """Wait for the async pool's connections and prepare their hot statements"""
+    try:
+        await async_db.warm_up()
+    except Exception as e:
+        # Requests retry the connection; startup doesn't have to fail
+        print(f"⚠️ Async database warm-up failed: {e}")
+
+
+def open_sync_db():
+    """Open the sync database pool (on import)"""
+    try:
+        from app.core.database import db
+    except Exception as e:
+        # Requests retry the connection; startup doesn't have to fail
+        print(f"⚠️ Database connection failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The async connection pool has to be opened inside the event loop
+    await async_db.open()
+    await warm_up_async_db()
+    if settings.DB_STREAM_TRANSACTIONS:
+        # Streamed reads go through the sync manager
+        await run_in_threadpool(open_sync_db)
+    report_jobs.start()
+    yield
+    await report_jobs.stop()
+    insights_workers.shutdown()
+    await async_db.close()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -18,12 +67,71 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def route_path(request: Request) -> str:
+    """Route template (/history/{report_id}) rather than the raw path"""
+    for route in request.app.router.routes:
+        if route.matches(request.scope)[0] == Match.FULL:
+            return route.path
+    return 'unmatched'
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Feed the per-route latency histogram"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    
+    metrics.HTTP_REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route_path(request),
+        status=str(response.status_code)
+    )
+    return response
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """
+    Opt-in cProfile of a request: sent with the admin X-Profile-Token header,
+    or sampled (PROFILE_SAMPLE_RATE) and kept if slower than
+    PROFILE_SLOW_REQUEST_SECONDS. Saved profiles are listed under /admin/profiles.
+    Covers the request's synchronous CPU work (profiling.section()), not the
+    time spent awaiting the database or the LLM, nor other requests' work.
+    """
+    reason = profiling.should_profile(request.headers.get('X-Profile-Token'))
+    profile = profiling.start(reason) if reason else None
+    if profile is None:
+        return await call_next(request)
+    
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        profiling.stop(profile)
+    duration = time.perf_counter() - start
+    
+    if profiling.should_keep(profile, duration):
+        name = await run_in_threadpool(profiling.save, profile, route_path(request), duration)
+        response.headers['X-Profile-Name'] = name
+    return response
+
 # Include routers
 app.include_router(
     reports.router,
     prefix=f"{settings.API_V1_STR}/reports",
     tags=["reports"]
 )
+app.include_router(
+    profiles.router,
+    prefix=f"{settings.API_V1_STR}/admin/profiles",
+    tags=["admin"]
+)
+app.include_router(
+    insights_batch_routes.router,
+    prefix=f"{settings.API_V1_STR}/admin/insights",
+    tags=["admin"]
+)
 
 
 @app.get("/")
@@ -37,8 +145,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "llm": llm_client.stats(),
+        "llm_cache": llm_cache.stats(),
+        "insights_cache": insights_cache.stats(),
+        "report_jobs": report_jobs.stats(),
+        "single_flight": single_flight.stats(),
+        "insights_batch": insights_batch.stats()
+    }
+
+
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Latency histograms and pool/LLM gauges in Prometheus text format"""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,10 @@
+-- Per-user monthly aggregate snapshots used for incremental insights
+CREATE TABLE IF NOT EXISTS ai_insight_snapshots (
+    user_id UUID NOT NULL,
+    month DATE NOT NULL,                     -- first day of the month
+    num_transactions INTEGER NOT NULL,       -- watermark: transactions in the month
+    last_updated_at TIMESTAMPTZ,             -- watermark: MAX(updated_at) in the month
+    aggregates JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (user_id, month)
+);
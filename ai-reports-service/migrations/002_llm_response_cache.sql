@@ -0,0 +1,9 @@
+-- Generated reports keyed by a hash of the model name and prompt
+CREATE TABLE IF NOT EXISTS ai_llm_cache (
+    prompt_hash TEXT PRIMARY KEY,            -- sha256 of model name + prompt
+    model_used VARCHAR(100) NOT NULL,
+    response TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_llm_cache_created_at ON ai_llm_cache (created_at);
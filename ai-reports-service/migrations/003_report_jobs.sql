@@ -0,0 +1,15 @@
+-- Background report generation jobs
+CREATE TABLE IF NOT EXISTS ai_report_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL,
+    start_date DATE,
+    end_date DATE,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',   -- pending, running, done, failed
+    result JSONB,                                    -- report response once done
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Finding a user's active job for de-duplication
+CREATE INDEX IF NOT EXISTS idx_ai_report_jobs_user_status ON ai_report_jobs (user_id, status);
@@ -0,0 +1,2 @@
+-- Keyset pagination of a user's report history (ORDER BY created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_ai_reports_user_created_at ON ai_reports (user_id, created_at DESC, id DESC);
@@ -0,0 +1,8 @@
+-- Compressed report bodies (REPORT_COMPRESSION, see app/core/compression.py):
+-- a version byte naming the codec, then the zlib or zstd data. Rows store
+-- either the plain or the compressed columns, never both
+ALTER TABLE ai_reports ADD COLUMN IF NOT EXISTS report_text_compressed BYTEA;
+ALTER TABLE ai_reports ADD COLUMN IF NOT EXISTS processed_insights_compressed BYTEA;
+
+ALTER TABLE ai_reports ALTER COLUMN report_text DROP NOT NULL;
+ALTER TABLE ai_reports ALTER COLUMN processed_insights DROP NOT NULL;
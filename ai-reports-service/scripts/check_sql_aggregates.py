@@ -0,0 +1,82 @@
+"""
+Check that SQL aggregate insights mode matches the Python engine
+
+Runs against the database in DATABASE_URL (e.g. a local PostgreSQL with
+test data). For every user, processes the raw transactions in Python and
+the aggregates computed by PostgreSQL, and compares the insights.
+
+    python scripts/check_sql_aggregates.py [--user USER_ID ...] [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+
+Exits with status 1 if any user's insights differ.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import db
+from app.services.data_processor import FinancialDataProcessor
+
+
+def list_users(limit: int):
+    with db.get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT DISTINCT user_id FROM transactions LIMIT %s", (limit,))
+        return [str(row[0]) for row in cursor.fetchall()]
+
+
+def diff(expected, actual, path=''):
+    """Paths at which two insights dicts differ"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        paths = []
+        for key in expected.keys() | actual.keys():
+            paths += diff(expected.get(key), actual.get(key), f"{path}.{key}")
+        return paths
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        paths = []
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            paths += diff(e, a, f"{path}[{i}]")
+        return paths
+    return [] if expected == actual else [path or '.']
+
+
+def check_user(user_id: str, start_date, end_date):
+    transactions = db.get_transactions_by_user(user_id, start_date, end_date)
+    aggregates = db.get_transaction_aggregates(user_id, start_date, end_date)
+
+    # Nothing in the range: the endpoints answer 404 before processing
+    if not transactions:
+        return 0, [] if aggregates.num_transactions == 0 else ['.num_transactions']
+
+    expected = FinancialDataProcessor(transactions).process()
+    actual = FinancialDataProcessor([], snapshots=[aggregates]).process()
+
+    return len(transactions), diff(expected, actual)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--user', action='append', help="User to check (default: every user)")
+    parser.add_argument('--start', help="Start date filter")
+    parser.add_argument('--end', help="End date filter")
+    parser.add_argument('--limit', type=int, default=1000, help="Max users when checking every user")
+    args = parser.parse_args()
+
+    users = args.user or list_users(args.limit)
+    failed = 0
+    for user_id in users:
+        num_transactions, mismatches = check_user(user_id, args.start, args.end)
+        if mismatches:
+            failed += 1
+            print(f"❌ {user_id} ({num_transactions} transactions): differs at {', '.join(sorted(mismatches))}")
+        else:
+            print(f"✅ {user_id} ({num_transactions} transactions)")
+
+    print(f"\n{len(users) - failed}/{len(users)} users match")
+    db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
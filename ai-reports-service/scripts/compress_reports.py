@@ -0,0 +1,130 @@
+"""
+Compress (or decompress) the bodies of existing reports
+
+Runs against the database in DATABASE_URL after migrations/005. Rewrites
+report_text and processed_insights of plain rows into the compressed
+columns, batch by batch in id order, so it can be stopped and rerun.
+
+    python scripts/compress_reports.py [--codec zlib|zstd] [--batch-size N]
+    python scripts/compress_reports.py --decompress
+
+Reports are read from whichever columns hold them, so this works with any
+REPORT_COMPRESSION; --decompress moves rows back to the plain columns.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import compression
+from app.core.database import db
+
+
+PLAIN_ROWS_SQL = """
+    SELECT id, report_text, processed_insights
+    FROM ai_reports
+    WHERE id > %s
+      AND report_text_compressed IS NULL
+      AND processed_insights_compressed IS NULL
+    ORDER BY id
+    LIMIT %s
+"""
+
+COMPRESS_ROW_SQL = """
+    UPDATE ai_reports
+    SET report_text_compressed = %s, processed_insights_compressed = %s,
+        report_text = NULL, processed_insights = NULL
+    WHERE id = %s
+"""
+
+COMPRESSED_ROWS_SQL = """
+    SELECT id, report_text_compressed, processed_insights_compressed
+    FROM ai_reports
+    WHERE id > %s
+      AND (report_text_compressed IS NOT NULL OR processed_insights_compressed IS NOT NULL)
+    ORDER BY id
+    LIMIT %s
+"""
+
+DECOMPRESS_ROW_SQL = """
+    UPDATE ai_reports
+    SET report_text = %s, processed_insights = %s,
+        report_text_compressed = NULL, processed_insights_compressed = NULL
+    WHERE id = %s
+"""
+
+
+def compress_row(row, codec: str):
+    report_id, report_text, insights = row
+    # JSONB comes back parsed
+    if insights is not None and not isinstance(insights, str):
+        insights = json.dumps(insights)
+    return (
+        compression.compress_text(report_text, codec),
+        compression.compress_text(insights, codec),
+        report_id
+    ), len((report_text or '').encode()) + len((insights or '').encode())
+
+
+def decompress_row(row):
+    report_id, report_text, insights = row
+    return (
+        compression.decompress_text(report_text),
+        compression.decompress_text(insights),
+        report_id
+    ), len(report_text or b'') + len(insights or b'')
+
+
+def size_of(params) -> int:
+    """Stored size of the two body values in an UPDATE's params"""
+    return sum(len(value if isinstance(value, bytes) else value.encode()) for value in params[:2] if value is not None)
+
+
+def rewrite(select_sql: str, update_sql: str, convert, batch_size: int):
+    """Convert every matching row; returns (rows, bytes before, bytes after)"""
+    last_id, rows, before, after = 0, 0, 0, 0
+    while True:
+        # One transaction per batch
+        with db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(select_sql, (last_id, batch_size))
+            batch = cursor.fetchall()
+            if not batch:
+                return rows, before, after
+
+            updates = []
+            for row in batch:
+                params, size = convert(row)
+                updates.append(params)
+                before += size
+                after += size_of(params)
+            cursor.executemany(update_sql, updates)
+
+        last_id = batch[-1][0]
+        rows += len(batch)
+        print(f"  {rows} reports rewritten (up to id {last_id})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--codec', default='zlib', choices=sorted(compression.CODECS), help="Compression codec")
+    parser.add_argument('--decompress', action='store_true', help="Move compressed rows back to the plain columns")
+    parser.add_argument('--batch-size', type=int, default=500, help="Rows per transaction")
+    args = parser.parse_args()
+
+    if args.decompress:
+        rows, before, after = rewrite(COMPRESSED_ROWS_SQL, DECOMPRESS_ROW_SQL, decompress_row, args.batch_size)
+    else:
+        compression.check_codec(args.codec)
+        rows, before, after = rewrite(
+            PLAIN_ROWS_SQL, COMPRESS_ROW_SQL, lambda row: compress_row(row, args.codec), args.batch_size
+        )
+
+    print(f"\n✅ {rows} reports rewritten: {before} → {after} bytes")
+    db.close()
+
+
+if __name__ == '__main__':
+    main()
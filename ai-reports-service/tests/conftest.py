@@ -0,0 +1,44 @@
+import os
+import sys
+import psycopg
+import pytest
+
+# Run from anywhere, like the scripts: the service root goes on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Module-level managers need a URL to construct; no test connects through them
+os.environ.setdefault('DATABASE_URL', 'postgresql://localhost/ai_reports_test')
+
+
+@pytest.fixture
+def pg_conn():
+    """
+    Connection to the PostgreSQL in TEST_DATABASE_URL, with an empty temporary
+    transactions table shadowing any real one; skips when there is none
+    """
+    url = os.environ.get('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    try:
+        conn = psycopg.connect(url, connect_timeout=5)
+    except psycopg.OperationalError as e:
+        pytest.skip(f"PostgreSQL is not available: {e}")
+
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMPORARY TABLE transactions (
+            id BIGSERIAL PRIMARY KEY,
+            user_id UUID NOT NULL,
+            type TEXT NOT NULL,
+            amount NUMERIC(12, 2) NOT NULL,
+            category_id INTEGER NOT NULL,
+            description TEXT,
+            date DATE NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
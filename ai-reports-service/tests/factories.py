@@ -0,0 +1,54 @@
+"""Synthetic transaction rows for the tests, with plenty of ties"""
+import json
+import random
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+from app.core import queries
+from app.core.categories import CATEGORIES, TransactionType
+from app.core.records import Transaction
+
+
+INCOME_CATEGORIES = [i for i, c in CATEGORIES.items() if c.type == TransactionType.INCOME]
+EXPENSE_CATEGORIES = [i for i, c in CATEGORIES.items() if c.type == TransactionType.EXPENSE]
+
+# Few distinct amounts and descriptions, so equal values compete in every tie-break
+AMOUNTS = (500, 1250, 1250, 4999, 10000, 10000, 250000)
+DESCRIPTIONS = ('Coffee', 'Rent', 'Groceries', None)
+
+
+def random_rows(seed: int, count: int, start: date = date(2024, 1, 1), days: int = 150) -> List[Tuple]:
+    """
+    count transaction rows in insertion (id) order, as (type, cents, category id, description, date)
+    Dates are shuffled, so id order and date order disagree
+    """
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        kind = 'income' if rng.random() < 0.15 else 'expense'
+        rows.append((
+            kind,
+            rng.choice(AMOUNTS),
+            rng.choice(INCOME_CATEGORIES if kind == 'income' else EXPENSE_CATEGORIES[:5]),
+            rng.choice(DESCRIPTIONS),
+            start + timedelta(days=rng.randrange(days))
+        ))
+    return rows
+
+
+def in_range(row: Tuple, start_date: Optional[str], end_date: Optional[str]) -> bool:
+    when = row[4]
+    return (not start_date or when >= date.fromisoformat(start_date)) and (
+        not end_date or when <= date.fromisoformat(end_date))
+
+
+def query_order(rows: List[Tuple], start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Transaction]:
+    """Records for rows in the range, as build_transactions_query returns them (date DESC, id)"""
+    selected = [(i, row) for i, row in enumerate(rows) if in_range(row, start_date, end_date)]
+    selected.sort(key=lambda item: (-item[1][4].toordinal(), item[0]))
+    return [queries.transaction_from_row(row) for _, row in selected]
+
+
+def assert_same_insights(actual, expected):
+    """Equal, down to key order and which of several equal values won"""
+    assert actual == expected
+    assert json.dumps(actual) == json.dumps(expected)
@@ -0,0 +1,113 @@
+import json
+import uuid
+from datetime import datetime, timezone
+import pytest
+from app.core import compression, queries
+
+
+CODECS = [
+    'zlib',
+    pytest.param('zstd', marks=pytest.mark.skipif(compression.zstandard is None, reason="zstandard is not installed")),
+]
+
+REPORT_TEXT = "## Your month\n\nGroceries were up 12% — mostly weekend shopping. " * 40
+
+INSIGHTS = {
+    'summary': {'total_income': 5200.0, 'total_expenses': 3875.5, 'savings_rate': 25.47},
+    'time_period': {'start_date': '2024-01-01', 'end_date': '2024-01-31', 'num_transactions': 3},
+    'category_breakdown': {'Groceries': {'total': 412.3, 'count': 9, 'percentage': 10.64}},
+    'anomalies': [{'description': 'Café ☕', 'amount': 250.0}],
+}
+
+
+@pytest.mark.parametrize('codec', CODECS)
+@pytest.mark.parametrize('data', [b'', b'x', REPORT_TEXT.encode(), bytes(range(256)) * 50])
+def test_compress_round_trip(codec, data):
+    blob = compression.compress(data, codec)
+
+    assert blob[0] == compression.CODECS[codec]
+    assert compression.decompress(blob) == data
+    assert compression.decompress(memoryview(blob)) == data  # buffers are accepted too
+
+
+@pytest.mark.parametrize('codec', CODECS)
+def test_compress_text_round_trip(codec):
+    assert compression.decompress_text(compression.compress_text(REPORT_TEXT, codec)) == REPORT_TEXT
+    assert compression.compress_text(None, codec) is None
+    assert compression.decompress_text(None) is None
+
+
+def test_compress_shrinks_report_text():
+    assert len(compression.compress_text(REPORT_TEXT, 'zlib')) < len(REPORT_TEXT.encode()) // 5
+
+
+@pytest.mark.parametrize('blob', [b'', b'\x07abc', b'\x01not zlib'])
+def test_decompress_rejects_bad_blobs(blob):
+    with pytest.raises(Exception):
+        compression.decompress(blob)
+
+
+def test_check_codec_rejects_unknown():
+    with pytest.raises(ValueError):
+        compression.check_codec('lz4')
+
+
+BODY_COLUMNS = ('report_text', 'processed_insights')
+
+
+def stored_row(params, codec, jsonb_parsed=False):
+    """The ai_reports row (REPORT_COLUMNS) that SAVE_REPORT_SQL writes for params"""
+    report_text, insights = params[1], params[2]
+    row = {
+        'id': 7, 'user_id': uuid.UUID(params[0]), 'start_date': params[3], 'end_date': params[4],
+        'num_transactions': params[5], 'savings_rate': params[6], 'total_income': params[7],
+        'total_expenses': params[8], 'model_used': params[9],
+        'created_at': datetime(2024, 2, 1, tzinfo=timezone.utc),
+        'report_text': None, 'processed_insights': None,
+        'report_text_compressed': None, 'processed_insights_compressed': None,
+    }
+    if codec:
+        row['report_text_compressed'], row['processed_insights_compressed'] = report_text, insights
+    else:
+        row['report_text'] = report_text
+        # JSONB comes back parsed from the database
+        row['processed_insights'] = json.loads(insights) if jsonb_parsed else insights
+    return row
+
+
+@pytest.mark.parametrize('codec', [None] + CODECS)
+@pytest.mark.parametrize('jsonb_parsed', [False, True])
+def test_report_row_round_trip(monkeypatch, codec, jsonb_parsed):
+    monkeypatch.setattr(queries, 'REPORT_COMPRESSION', codec)
+    user_id = str(uuid.uuid4())
+    params = queries.save_report_params(user_id, REPORT_TEXT, INSIGHTS, '2024-01-01', '2024-01-31', 'model')
+
+    if codec:
+        assert all(isinstance(value, bytes) for value in params[1:3])
+    assert params[5:9] == (3, 25.47, 5200.0, 3875.5)
+
+    report = queries.report_from_row(stored_row(params, codec, jsonb_parsed))
+
+    assert report['report_text'] == REPORT_TEXT
+    assert report['processed_insights'] == INSIGHTS
+    assert report['user_id'] == user_id
+    assert not any(column.endswith('_compressed') for column in report)
+
+
+def test_compressed_rows_load_with_compression_off(monkeypatch):
+    # e.g. scripts/compress_reports.py run while REPORT_COMPRESSION is none
+    monkeypatch.setattr(queries, 'REPORT_COMPRESSION', 'zlib')
+    params = queries.save_report_params(str(uuid.uuid4()), REPORT_TEXT, INSIGHTS, None, None, 'model')
+    monkeypatch.setattr(queries, 'REPORT_COMPRESSION', None)
+
+    report = queries.report_from_row(stored_row(params, 'zlib'))
+
+    assert report['report_text'] == REPORT_TEXT
+    assert report['processed_insights'] == INSIGHTS
+
+
+def test_report_columns_include_both_bodies():
+    for column in BODY_COLUMNS:
+        assert column in queries.REPORT_COLUMNS
+        assert f"{column}_compressed" in queries.REPORT_COLUMNS
+        assert f"{column}_compressed" in queries.REPORT_BY_ID_SQL
@@ -0,0 +1,165 @@
+"""
+FinancialDataProcessor against fixed expected insights, for dict rows and
+Transaction records alike (the values are the original implementation's)
+"""
+from datetime import date
+from decimal import Decimal
+import json
+import pytest
+from app.core.money import Money
+from app.core.records import Transaction
+from app.services.data_processor import FinancialDataProcessor
+
+
+MISSING = object()  # dict rows without a description key
+
+ROWS = [
+    ('income', '3000.00', 'Salary', 'Paycheck', date(2024, 1, 1)),
+    ('expense', '50.00', 'Groceries', 'Market', date(2024, 1, 2)),
+    ('expense', '50.00', 'Transport', 'Bus pass', date(2024, 1, 3)),
+    ('expense', '20.00', 'Groceries', MISSING, date(2024, 1, 9)),
+    ('expense', '20.00', 'Transport', None, date(2024, 1, 10)),
+    ('expense', '12.50', 'Coffee', 'Latte', date(2024, 1, 16)),
+    ('expense', '12.50', 'Coffee', 'Latte', date(2024, 1, 17)),
+    ('expense', '900.00', 'Shopping', 'New jacket', date(2024, 1, 20)),
+    ('income', '250.00', 'Freelance', 'Invoice 7', date(2024, 1, 25)),
+    ('expense', '30.00', 'Dining', 'Lunch', date(2024, 1, 23)),
+    ('expense', '30.00', 'Dining', 'Lunch', date(2024, 1, 30)),
+    ('expense', '15.00', 'Coffee', 'Beans', date(2024, 1, 31)),
+]
+
+EXPECTED = {
+    'time_period': {'start_date': '2024-01-01', 'end_date': '2024-01-31', 'num_days': 31, 'num_transactions': 12},
+    'summary': {
+        'total_income': 3250.0,
+        'total_expenses': 1140.0,
+        'net_savings': 2110.0,
+        'savings_rate': 64.92307692307692,
+        'avg_daily_spending': 36.774193548387096,
+    },
+    'spending_by_category': [
+        {'category': 'Shopping', 'total_spent': 900.0, 'num_transactions': 1, 'percentage_of_total': 78.94736842105263,
+         'avg_transaction': 900.0, 'largest_transaction': 900.0},
+        {'category': 'Groceries', 'total_spent': 70.0, 'num_transactions': 2, 'percentage_of_total': 6.140350877192983,
+         'avg_transaction': 35.0, 'largest_transaction': 50.0},
+        {'category': 'Transport', 'total_spent': 70.0, 'num_transactions': 2, 'percentage_of_total': 6.140350877192983,
+         'avg_transaction': 35.0, 'largest_transaction': 50.0},
+        {'category': 'Dining', 'total_spent': 60.0, 'num_transactions': 2, 'percentage_of_total': 5.2631578947368425,
+         'avg_transaction': 30.0, 'largest_transaction': 30.0},
+        {'category': 'Coffee', 'total_spent': 40.0, 'num_transactions': 3, 'percentage_of_total': 3.508771929824561,
+         'avg_transaction': 13.333333333333334, 'largest_transaction': 15.0},
+    ],
+    'income_analysis': {
+        'total_income': 3250.0,
+        'num_income_transactions': 2,
+        'avg_income_transaction': 1625.0,
+        'income_sources': {'Salary': 3000.0, 'Freelance': 250.0},
+        'largest_income': {'amount': 3000.0, 'date': '2024-01-01', 'category': 'Salary'},
+    },
+    'spending_patterns': {
+        'spending_by_day': {
+            'Tuesday': {'total': 142.5, 'avg': 28.5, 'count': 5},
+            'Wednesday': {'total': 97.5, 'avg': 24.375, 'count': 4},
+            'Saturday': {'total': 900.0, 'avg': 900.0, 'count': 1},
+        },
+        'most_active_day': 'Tuesday',
+        'avg_days_between_transactions': 3.2222222222222223,
+        'spending_frequency': 'low',
+    },
+    'comparisons': {
+        'vs_typical_savings_rate': {'value': 64.92307692307692, 'benchmark': 20.0, 'difference': 44.92307692307692,
+                                    'performance': 'above'},
+        'spending_trend': 'increasing',
+    },
+    'anomalies': [
+        {'transaction': {'amount': 900.0, 'date': '2024-01-20', 'description': 'New jacket', 'category': 'Shopping'},
+         'reason': 'unusually_high', 'deviation': 2.8424547919358987},
+    ],
+    'milestones': [
+        {'type': 'positive_savings', 'message': 'You saved 64.9% of your income', 'sentiment': 'positive'},
+        {'type': 'excellent_savings', 'message': 'Excellent savings rate above 20%', 'sentiment': 'very_positive'},
+        {'type': 'controlled_spending', 'message': "You're being thoughtful with your spending frequency",
+         'sentiment': 'positive'},
+    ],
+    'behavioral_insights': [
+        'You tend to spend most on Tuesdays',
+        'Shopping dominates your spending at 79% of expenses',
+        'Your spending has been trending upward recently',
+    ],
+}
+
+# Equal totals, counts and amounts, listed out of date order
+TIED_ROWS = [
+    ('income', '100.00', 'Gift', 'Birthday', date(2024, 3, 1)),
+    ('expense', '25.00', 'Art', 'Paints', date(2024, 3, 5)),
+    ('expense', '25.00', 'Zoo', 'Tickets', date(2024, 3, 4)),
+    ('income', '100.00', 'Refund', 'Returned shoes', date(2024, 3, 2)),
+    ('expense', '10.00', 'Zoo', 'Snacks', date(2024, 3, 11)),
+    ('expense', '10.00', 'Art', 'Brushes', date(2024, 3, 12)),
+]
+
+
+def as_dict(row):
+    kind, amount, category, description, when = row
+    t = {'type': kind, 'amount': Decimal(amount), 'category_id': category, 'date': when}
+    if description is not MISSING:
+        t['description'] = description
+    return t
+
+
+def as_record(row):
+    kind, amount, category, description, when = row
+    return Transaction(kind, Money.from_amount(amount), category, None if description is MISSING else description, when)
+
+
+INPUTS = [pytest.param(as_dict, id='dict'), pytest.param(as_record, id='record')]
+
+
+@pytest.mark.parametrize('convert', INPUTS)
+def test_insights(convert):
+    insights = FinancialDataProcessor([convert(row) for row in ROWS]).process()
+
+    assert insights == EXPECTED
+    # Same key order too, so the serialized report doesn't change
+    assert json.dumps(insights) == json.dumps(EXPECTED)
+
+
+@pytest.mark.parametrize('convert', INPUTS)
+def test_ties_keep_first_seen_order(convert):
+    insights = FinancialDataProcessor([convert(row) for row in TIED_ROWS]).process()
+
+    assert [(c['category'], c['total_spent'], c['largest_transaction']) for c in insights['spending_by_category']] == [
+        ('Art', 35.0, 25.0), ('Zoo', 35.0, 25.0)
+    ]
+    assert insights['income_analysis']['income_sources'] == {'Gift': 100.0, 'Refund': 100.0}
+    assert list(insights['income_analysis']['income_sources']) == ['Gift', 'Refund']
+    assert insights['income_analysis']['largest_income'] == {'amount': 100.0, 'date': '2024-03-01', 'category': 'Gift'}
+    assert list(insights['spending_patterns']['spending_by_day']) == ['Tuesday', 'Monday']
+    assert insights['spending_patterns']['most_active_day'] == 'Tuesday'
+    assert insights['comparisons']['spending_trend'] == 'decreasing'
+    assert insights['behavioral_insights'][1] == 'Art dominates your spending at 50% of expenses'
+
+
+def anomaly_rows(description):
+    rows = [('expense', '10.00', 'Coffee', 'Espresso', date(2024, 4, day)) for day in range(1, 11)]
+    rows.append(('expense', '500.00', 'Rent', description, date(2024, 4, 15)))
+    rows.append(('expense', '500.00', 'Travel', 'Flights', date(2024, 4, 12)))
+    return rows
+
+
+@pytest.mark.parametrize('convert,description,expected', [
+    pytest.param(as_dict, MISSING, 'No description', id='dict-missing'),
+    pytest.param(as_dict, None, 'None', id='dict-none'),
+    pytest.param(as_dict, 'April rent', 'April rent', id='dict'),
+    pytest.param(as_record, None, 'None', id='record-none'),
+    pytest.param(as_record, 'April rent', 'April rent', id='record'),
+])
+def test_anomaly_descriptions(convert, description, expected):
+    anomalies = FinancialDataProcessor([convert(row) for row in anomaly_rows(description)]).process()['anomalies']
+
+    # Equal deviations stay in input order
+    assert [a['transaction'] for a in anomalies] == [
+        {'amount': 500.0, 'date': '2024-04-15', 'description': expected, 'category': 'Rent'},
+        {'amount': 500.0, 'date': '2024-04-12', 'description': 'Flights', 'category': 'Travel'},
+    ]
+    assert anomalies[0]['deviation'] == anomalies[1]['deviation'] == pytest.approx(2.140872096444188)
@@ -0,0 +1,125 @@
+"""
+Insights computed in worker processes (INSIGHTS_EXECUTION=process, and the
+batch endpoint) must equal the ones computed inline
+"""
+import asyncio
+import uuid
+import pytest
+from app.core import queries
+from app.core.config import settings
+from app.services import report_generator
+from app.services.data_processor import FinancialDataProcessor
+from app.services.insights_batch import InsightsBatch
+from app.services.insights_workers import (
+    InsightsWorkerPool, pack_rows, unpack_rows, pack_transactions, unpack_transactions
+)
+from app.services.report_generator import ReportGenerator
+from factories import random_rows, query_order, assert_same_insights
+
+
+@pytest.fixture(scope='module')
+def workers():
+    # One spawned worker for the whole module; starting it is the slow part
+    pool = InsightsWorkerPool(1)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_pack_rows_round_trip(seed):
+    rows = random_rows(seed, 200)
+
+    assert unpack_rows(pack_rows(rows)) == rows
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_pack_transactions_round_trip(seed):
+    transactions = query_order(random_rows(seed, 200))
+
+    unpacked = unpack_transactions(pack_transactions(transactions))
+
+    assert [repr(t) for t in unpacked] == [repr(t) for t in transactions]
+
+
+def test_pack_transactions_rejects_dicts():
+    with pytest.raises((TypeError, AttributeError)):
+        pack_transactions([{'type': 'expense', 'amount': 10, 'date': '2024-01-01'}])
+
+
+def generate(transactions, snapshots):
+    generator = ReportGenerator(transactions, {'user_id': 'user'}, snapshots=snapshots)
+    return asyncio.run(generator.generate_async())
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('with_snapshots', [False, True])
+def test_generate_async_same_above_and_below_threshold(monkeypatch, workers, seed, with_snapshots):
+    monkeypatch.setattr(report_generator, 'insights_workers', workers)
+    monkeypatch.setattr(settings, 'INSIGHTS_EXECUTION', 'process')
+    monkeypatch.setattr(settings, 'INSIGHTS_PROCESS_MIN_TRANSACTIONS', 300)
+    transactions = query_order(random_rows(seed, 300))
+    snapshots = [FinancialDataProcessor(query_order(random_rows(seed + 50, 100))).aggregates] if with_snapshots else []
+    processor = FinancialDataProcessor(list(transactions), snapshots=snapshots)
+    expected = processor.process()
+
+    submitted = workers.submitted
+    in_worker = generate(list(transactions), snapshots)
+    assert workers.submitted == submitted + 1
+
+    monkeypatch.setattr(settings, 'INSIGHTS_PROCESS_MIN_TRANSACTIONS', 301)
+    inline = generate(list(transactions), snapshots)
+    assert workers.submitted == submitted + 1
+
+    assert_same_insights(in_worker['processed_insights'], expected)
+    assert_same_insights(inline['processed_insights'], expected)
+    assert in_worker['llm_prompt'] == inline['llm_prompt']
+    assert in_worker['metadata']['num_transactions'] == inline['metadata']['num_transactions'] \
+        == processor.aggregates.num_transactions
+
+
+def test_generate_async_keeps_dicts_inline(monkeypatch, workers):
+    monkeypatch.setattr(report_generator, 'insights_workers', workers)
+    monkeypatch.setattr(settings, 'INSIGHTS_EXECUTION', 'process')
+    monkeypatch.setattr(settings, 'INSIGHTS_PROCESS_MIN_TRANSACTIONS', 1)
+    transactions = [
+        {'type': t.type, 'amount': float(t.amount), 'category_id': t.category_id,
+         'description': t.description, 'date': t.date.isoformat()}
+        for t in query_order(random_rows(0, 100))
+    ]
+
+    submitted = workers.submitted
+    package = generate(transactions, [])
+
+    assert workers.submitted == submitted
+    assert_same_insights(package['processed_insights'], FinancialDataProcessor(transactions).process())
+
+
+class FakeDatabase:
+    """The AsyncDatabaseManager stream InsightsBatch reads, over rows in memory"""
+
+    def __init__(self, rows_by_user):
+        self.rows_by_user = rows_by_user
+
+    async def iter_transaction_rows_by_users(self, user_ids, start_date=None, end_date=None):
+        # Grouped by user, like the query's ORDER BY user_id
+        for user_id in sorted(user_ids):
+            for row in self.rows_by_user.get(user_id, []):
+                yield user_id, row
+
+
+def test_batch_matches_inline(workers):
+    users = [str(uuid.UUID(int=i + 1)) for i in range(4)]
+    rows_by_user = {user_id: random_rows(i, 150) for i, user_id in enumerate(users[:3])}
+    batch = InsightsBatch(FakeDatabase(rows_by_user), workers)
+
+    requested = list(reversed(users)) + [users[0]]
+    results, missing = asyncio.run(batch.run(requested))
+
+    assert list(results) == list(reversed(users[:3]))
+    assert missing == [users[3]]
+    for user_id, rows in rows_by_user.items():
+        expected = FinancialDataProcessor([queries.transaction_from_row(row) for row in rows]).process()
+        assert_same_insights(results[user_id]['processed_insights'], expected)
+        assert results[user_id]['metadata']['user_id'] == user_id
+        assert results[user_id]['metadata']['num_transactions'] == len(rows)
+    assert batch.stats()['users'] == 3
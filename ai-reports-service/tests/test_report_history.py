@@ -0,0 +1,177 @@
+import asyncio
+import base64
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from psycopg.rows import dict_row
+from app.core import queries
+from app.api.routes import reports as report_routes
+
+
+CREATED_AT = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+
+
+def make_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('created_at,report_id', [
+    (CREATED_AT, 1),
+    (CREATED_AT.replace(microsecond=0), 2 ** 40),
+    (datetime(2023, 12, 31, 23, 0, tzinfo=timezone(timedelta(hours=-5))), 42),
+])
+def test_cursor_round_trip(created_at, report_id):
+    cursor = queries.encode_report_cursor({'created_at': created_at, 'id': report_id})
+
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor  # URL-safe as is
+    decoded_at, decoded_id = queries.decode_report_cursor(cursor)
+    assert datetime.fromisoformat(decoded_at) == created_at
+    assert decoded_id == report_id
+
+
+@pytest.mark.parametrize('cursor', [
+    '',
+    'not a cursor',
+    '!!!!',
+    'é',
+    base64.urlsafe_b64encode(b'\xff\xfe').decode(),
+    make_cursor('2024-05-01T00:00:00+00:00'),
+    make_cursor([]),
+    make_cursor(['2024-05-01T00:00:00+00:00']),
+    make_cursor(['2024-05-01T00:00:00+00:00', 1, 2]),
+    make_cursor({'created_at': '2024-05-01', 'id': 1}),
+    make_cursor(['yesterday', 1]),
+    make_cursor([20240501, 1]),
+    make_cursor([None, 1]),
+    make_cursor(['2024-05-01T00:00:00+00:00', '1']),
+    make_cursor(['2024-05-01T00:00:00+00:00', 1.5]),
+    make_cursor(['2024-05-01T00:00:00+00:00', True]),
+    make_cursor(['2024-05-01T00:00:00+00:00', None]),
+])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        queries.decode_report_cursor(cursor)
+
+
+def test_cursor_timestamp_is_normalized():
+    # fromisoformat takes forms PostgreSQL doesn't, e.g. ISO week dates
+    created_at, _ = queries.decode_report_cursor(make_cursor(['2024-W18-3T12:00:00+00:00', 1]))
+
+    assert created_at == '2024-05-01T12:00:00+00:00'
+
+
+def test_next_cursor_points_past_the_page():
+    rows = [
+        {'id': report_id, 'user_id': uuid.UUID(int=1), 'created_at': CREATED_AT - timedelta(days=day)}
+        for report_id, day in ((5, 0), (4, 0), (3, 1))
+    ]
+
+    page, next_cursor = queries.reports_page_from_rows(rows, limit=2)
+    assert [r['id'] for r in page] == [5, 4]
+    assert queries.decode_report_cursor(next_cursor) == (CREATED_AT.isoformat(), 4)
+
+    page, next_cursor = queries.reports_page_from_rows(rows[2:], limit=2)
+    assert [r['id'] for r in page] == [3] and next_cursor is None
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.calls = []
+
+    async def get_user_reports(self, user_id, limit=10, after=None, include_body=False):
+        self.calls.append((user_id, limit, after, include_body))
+        return [{'id': 1}], None
+
+
+def history(monkeypatch, **params):
+    database = FakeDatabase()
+    monkeypatch.setattr(report_routes, 'async_db', database)
+    params = {'user_id': 'user', 'limit': 10, 'cursor': None, 'include_body': False, **params}
+    return asyncio.run(report_routes.get_report_history(**params)), database.calls
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', make_cursor(['yesterday', 1]), make_cursor(['2024-05-01', '1'])])
+def test_history_rejects_bad_cursor_with_400(monkeypatch, cursor):
+    with pytest.raises(HTTPException) as error:
+        history(monkeypatch, cursor=cursor)
+
+    assert error.value.status_code == 400
+    assert error.value.detail == "Invalid history cursor"
+
+
+def test_history_passes_cursor_and_include_body(monkeypatch):
+    cursor = queries.encode_report_cursor({'created_at': CREATED_AT, 'id': 7})
+
+    response, calls = history(monkeypatch, limit=5, cursor=cursor, include_body=True)
+
+    assert calls == [('user', 5, (CREATED_AT.isoformat(), 7), True)]
+    assert json.loads(response.body) == {'reports': [{'id': 1}], 'count': 1, 'next_cursor': None}
+
+
+def test_history_first_page_has_no_cursor(monkeypatch):
+    _, calls = history(monkeypatch)
+
+    assert calls == [('user', 10, None, False)]
+
+
+def test_history_query_breaks_created_at_ties_by_id():
+    query, params = queries.build_user_reports_query('user', 10, ('2024-05-01T00:00:00+00:00', 7))
+
+    assert 'ORDER BY created_at DESC, id DESC' in query
+    assert '(created_at, id) < (%s::timestamptz, %s)' in query
+    assert params == ['user', '2024-05-01T00:00:00+00:00', 7, 11]
+    assert 'report_text' not in queries.build_user_reports_query('user', 10)[0]
+    assert 'report_text' in queries.build_user_reports_query('user', 10, include_body=True)[0]
+
+
+@pytest.fixture
+def reports_table(pg_conn):
+    pg_conn.cursor().execute("""
+        CREATE TEMPORARY TABLE ai_reports (
+            id SERIAL PRIMARY KEY,
+            user_id UUID NOT NULL,
+            report_text TEXT,
+            processed_insights JSONB,
+            report_text_compressed BYTEA,
+            processed_insights_compressed BYTEA,
+            start_date DATE,
+            end_date DATE,
+            num_transactions INTEGER,
+            savings_rate NUMERIC,
+            total_income NUMERIC,
+            total_expenses NUMERIC,
+            model_used TEXT,
+            created_at TIMESTAMPTZ NOT NULL
+        )
+    """)
+    return pg_conn
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 10])
+def test_postgres_pages_through_created_at_ties(reports_table, limit):
+    user_id = str(uuid.uuid4())
+    cursor = reports_table.cursor(row_factory=dict_row)
+    # Three reports per timestamp, inserted out of order
+    for created_at in (CREATED_AT, CREATED_AT + timedelta(hours=1), CREATED_AT, CREATED_AT + timedelta(hours=1),
+                       CREATED_AT - timedelta(hours=1), CREATED_AT, CREATED_AT + timedelta(hours=1)):
+        cursor.execute(
+            "INSERT INTO ai_reports (user_id, report_text, model_used, created_at) VALUES (%s, 'Report', 'model', %s)",
+            (user_id, created_at)
+        )
+    cursor.execute("SELECT id, created_at FROM ai_reports ORDER BY created_at DESC, id DESC")
+    expected = [row['id'] for row in cursor.fetchall()]
+
+    seen, next_cursor = [], None
+    while True:
+        after = queries.decode_report_cursor(next_cursor) if next_cursor else None
+        cursor.execute(*queries.build_user_reports_query(user_id, limit, after))
+        page, next_cursor = queries.reports_page_from_rows(cursor.fetchall(), limit)
+        seen.extend(report['id'] for report in page)
+        if next_cursor is None:
+            break
+
+    assert seen == expected
+    # Within one timestamp, the higher id comes first
+    assert expected[:3] == sorted(expected[:3], reverse=True)
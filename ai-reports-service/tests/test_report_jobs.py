@@ -0,0 +1,181 @@
+import asyncio
+import uuid
+import pytest
+from fastapi import HTTPException
+from app.services.report_jobs import ReportJobQueue, JobQueueFullError
+
+
+class FakeDatabase:
+    """The AsyncDatabaseManager job methods ReportJobQueue uses, recording every status a job goes through"""
+
+    def __init__(self, fail_updates_to=None):
+        self.jobs = {}
+        self.statuses = {}
+        self.fail_updates_to = fail_updates_to
+
+    async def get_active_report_job(self, user_id, start_date, end_date, stale_seconds):
+        for job in self.jobs.values():
+            if (job['user_id'], job['start_date'], job['end_date']) == (user_id, start_date, end_date) \
+                    and job['status'] in ('pending', 'running'):
+                return dict(job)
+        return None
+
+    async def create_report_job(self, user_id, start_date, end_date):
+        job = {
+            'id': str(uuid.uuid4()), 'user_id': user_id, 'start_date': start_date, 'end_date': end_date,
+            'status': 'pending', 'result': None, 'error': None
+        }
+        self.jobs[job['id']] = job
+        self.statuses[job['id']] = ['pending']
+        return dict(job)
+
+    async def update_report_job(self, job_id, status, result=None, error=None):
+        if status == self.fail_updates_to:
+            raise RuntimeError("database unavailable")
+        self.jobs[job_id].update(status=status, result=result, error=error)
+        self.statuses[job_id].append(status)
+
+
+async def finished(db, *job_ids):
+    """Wait until the jobs are done or failed"""
+    for _ in range(1000):
+        if all(db.jobs[job_id]['status'] in ('done', 'failed') for job_id in job_ids):
+            return
+        await asyncio.sleep(0)
+    raise AssertionError(f"jobs still active: {[db.jobs[job_id] for job_id in job_ids]}")
+
+
+def run_queue(db, scenario, workers=2, max_pending=10):
+    async def main():
+        queue = ReportJobQueue(db, workers=workers, max_pending=max_pending)
+        queue.start()
+        try:
+            return await scenario(queue)
+        finally:
+            await queue.stop()
+    return asyncio.run(main())
+
+
+def test_job_runs_to_done():
+    db = FakeDatabase()
+    seen_while_running = []
+
+    async def run():
+        seen_while_running.extend(job['status'] for job in db.jobs.values())
+        return {'report_id': 1, 'report_text': 'Report'}
+
+    async def scenario(queue):
+        job, deduplicated = await queue.submit('user', '2024-01-01', '2024-01-31', run)
+        assert (job['status'], deduplicated) == ('pending', False)
+        await finished(db, job['id'])
+        return job, queue.stats()
+
+    job, stats = run_queue(db, scenario)
+
+    assert db.statuses[job['id']] == ['pending', 'running', 'done']
+    assert seen_while_running == ['running']
+    assert db.jobs[job['id']]['result'] == {'report_id': 1, 'report_text': 'Report'}
+    assert db.jobs[job['id']]['error'] is None
+    assert (stats['submitted'], stats['succeeded'], stats['failed']) == (1, 1, 0)
+
+
+@pytest.mark.parametrize('error,detail', [
+    (RuntimeError("LLM unavailable"), "LLM unavailable"),
+    (HTTPException(status_code=404, detail="No transactions found"), "No transactions found"),
+])
+def test_job_failure_is_recorded(error, detail):
+    db = FakeDatabase()
+
+    async def run():
+        raise error
+
+    async def scenario(queue):
+        job, _ = await queue.submit('user', None, None, run)
+        await finished(db, job['id'])
+        return job, queue.stats()
+
+    job, stats = run_queue(db, scenario)
+
+    assert db.statuses[job['id']] == ['pending', 'running', 'failed']
+    assert db.jobs[job['id']]['error'] == detail
+    assert db.jobs[job['id']]['result'] is None
+    assert (stats['succeeded'], stats['failed']) == (0, 1)
+
+
+def test_identical_active_job_is_reused():
+    db = FakeDatabase()
+
+    async def scenario(queue):
+        release = asyncio.Event()
+
+        async def run():
+            await release.wait()
+            return {'report_id': 1}
+
+        first, _ = await queue.submit('user', '2024-01-01', '2024-01-31', run)
+        again, deduplicated = await queue.submit('user', '2024-01-01', '2024-01-31', run)
+        other, other_deduplicated = await queue.submit('user', '2024-02-01', '2024-02-29', run)
+        release.set()
+        await finished(db, first['id'], other['id'])
+
+        # Once done, the same range queues a new job
+        later, later_deduplicated = await queue.submit('user', '2024-01-01', '2024-01-31', run)
+        await finished(db, later['id'])
+        return (first, again, deduplicated, other, other_deduplicated, later, later_deduplicated), queue.stats()
+
+    (first, again, deduplicated, other, other_deduplicated, later, later_deduplicated), stats = run_queue(db, scenario)
+
+    assert again['id'] == first['id'] and deduplicated
+    assert other['id'] != first['id'] and not other_deduplicated
+    assert later['id'] != first['id'] and not later_deduplicated
+    assert (stats['submitted'], stats['deduplicated'], stats['succeeded']) == (3, 1, 3)
+
+
+def test_full_queue_rejects_jobs():
+    db = FakeDatabase()
+
+    async def scenario(queue):
+        release = asyncio.Event()
+
+        async def run():
+            await release.wait()
+            return {}
+
+        running, _ = await queue.submit('user', None, '2024-01-01', run)
+        await asyncio.sleep(0)  # the only worker takes it
+        queued, _ = await queue.submit('user', None, '2024-01-02', run)
+        with pytest.raises(JobQueueFullError):
+            await queue.submit('user', None, '2024-01-03', run)
+
+        assert db.jobs[running['id']]['status'] == 'running'
+        assert db.jobs[queued['id']]['status'] == 'pending'
+        release.set()
+        await finished(db, running['id'], queued['id'])
+
+    run_queue(db, scenario, workers=1, max_pending=1)
+
+    assert [statuses[-1] for statuses in db.statuses.values()] == ['done', 'done']
+
+
+def test_worker_survives_unrecordable_failure():
+    db = FakeDatabase(fail_updates_to='failed')
+
+    async def fail():
+        raise RuntimeError("LLM unavailable")
+
+    async def succeed():
+        return {'report_id': 2}
+
+    async def scenario(queue):
+        failing, _ = await queue.submit('user', None, '2024-01-01', fail)
+        for _ in range(100):
+            await asyncio.sleep(0)
+        ok, _ = await queue.submit('user', None, '2024-01-02', succeed)
+        await finished(db, ok['id'])
+        return failing, ok
+
+    failing, ok = run_queue(db, scenario, workers=1)
+
+    # The failure couldn't be saved: the job stays 'running' until it goes stale
+    assert db.statuses[failing['id']] == ['pending', 'running']
+    assert db.statuses[ok['id']] == ['pending', 'running', 'done']
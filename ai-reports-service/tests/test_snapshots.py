@@ -0,0 +1,81 @@
+import asyncio
+import json
+from datetime import date, datetime, timezone
+import pytest
+from app.services.data_processor import FinancialDataProcessor
+from app.services.snapshots import InsightSnapshotStore
+from factories import random_rows, in_range, query_order, assert_same_insights
+
+
+UPDATED_AT = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+class FakeDatabase:
+    """The AsyncDatabaseManager methods InsightSnapshotStore uses, over rows in memory"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.saved = {}
+        self.fetched_months = []
+
+    async def get_monthly_watermarks(self, user_id, start_date=None, end_date=None):
+        watermarks = {}
+        for row in self.rows:
+            if in_range(row, start_date, end_date):
+                month = row[4].replace(day=1)
+                watermark = watermarks.setdefault(
+                    month, {'month': month, 'num_transactions': 0, 'last_updated_at': UPDATED_AT}
+                )
+                watermark['num_transactions'] += 1
+        return watermarks
+
+    async def get_insight_snapshots(self, user_id, months):
+        # Stored as JSONB: comes back as freshly parsed JSON
+        return {month: json.loads(self.saved[month]) for month in months if month in self.saved}
+
+    async def get_transactions_by_user(self, user_id, start_date=None, end_date=None, months=None):
+        self.fetched_months.append(list(months))
+        return [t for t in query_order(self.rows, start_date, end_date) if t.date.replace(day=1) in months]
+
+    async def save_insight_snapshots(self, user_id, snapshots):
+        for snapshot in snapshots:
+            self.saved[snapshot['month']] = json.dumps(snapshot['aggregates'])
+
+
+def load(store, start_date, end_date):
+    transactions, snapshots = asyncio.run(store.load('user', start_date, end_date))
+    return FinancialDataProcessor(transactions, snapshots=snapshots).process()
+
+
+RANGES = [
+    (None, None),
+    ('2024-01-01', '2024-05-31'),  # whole months only
+    ('2024-01-17', '2024-05-09'),  # partial months at both ends
+    ('2024-02-10', '2024-02-20'),  # inside a single month
+    ('2024-09-01', '2024-09-30'),  # nothing in the range
+]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('start_date,end_date', RANGES)
+def test_snapshots_match_full_recompute(seed, start_date, end_date):
+    rows = random_rows(seed, 400)
+    expected = FinancialDataProcessor(query_order(rows, start_date, end_date)).process()
+
+    database = FakeDatabase(rows)
+    store = InsightSnapshotStore(database)
+
+    # First load builds the snapshots, the second one is served from them
+    assert_same_insights(load(store, start_date, end_date), expected)
+    assert_same_insights(load(store, start_date, end_date), expected)
+
+
+def test_saved_months_are_not_fetched_again():
+    database = FakeDatabase(random_rows(0, 200))
+    store = InsightSnapshotStore(database)
+
+    load(store, '2024-01-17', '2024-05-09')
+    load(store, '2024-01-17', '2024-05-09')
+
+    assert sorted(database.saved) == [date(2024, m, 1) for m in (2, 3, 4)]
+    assert database.fetched_months[-1] == [date(2024, 1, 1), date(2024, 5, 1)]
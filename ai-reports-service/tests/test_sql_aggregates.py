@@ -0,0 +1,134 @@
+"""
+SQL aggregate mode (queries.build_aggregates_query + TransactionAggregates.from_grouped_rows)
+must give the same insights as FinancialDataProcessor over the raw rows
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List
+import uuid
+import pytest
+from psycopg.rows import dict_row
+from app.core import queries
+from app.core.records import Transaction
+from app.services.aggregates import TransactionAggregates, MAX_ANOMALIES
+from app.services.data_processor import FinancialDataProcessor
+from factories import random_rows, query_order, assert_same_insights
+
+
+def grouped_rows(transactions: List[Transaction]) -> List[Dict]:
+    """
+    What build_aggregates_query returns (after aggregate_row_from_row) for
+    transactions in build_transactions_query order: category, date and
+    largest-amount rows ordered by first_seen, sums as numeric
+    """
+    groups = {}
+    candidates = {'income': [], 'expense': []}
+    for rn, t in enumerate(transactions, 1):
+        cents = t.amount.cents
+        candidates[t.type].append((cents, rn, len(candidates[t.type]) + 1, t))
+
+        for kind, category_id, when in (('category', t.category_id, None), ('date', None, t.date)):
+            group = groups.get((kind, t.type, category_id, when))
+            if group is None:
+                group = groups[(kind, t.type, category_id, when)] = {
+                    'kind': kind, 'type': t.type, 'category_id': category_id, 'date': when,
+                    'total': Decimal(0), 'count': 0, 'largest': None, 'sum_of_squares': None,
+                    'description': None, 'seq': None, 'first_seen': rn
+                }
+            group['total'] += cents
+            group['count'] += 1
+            if kind == 'category':
+                group['largest'] = max(group['largest'] or Decimal(0), Decimal(cents))
+                group['sum_of_squares'] = (group['sum_of_squares'] or Decimal(0)) + cents * cents
+
+    rows = list(groups.values())
+    for kind, limit in (('expense', MAX_ANOMALIES), ('income', 1)):
+        for cents, rn, seq, t in sorted(candidates[kind], key=lambda c: (-c[0], c[1]))[:limit]:
+            rows.append({
+                'kind': 'largest', 'type': kind, 'category_id': t.category_id, 'date': t.date,
+                'total': Decimal(cents), 'count': None, 'largest': None, 'sum_of_squares': None,
+                'description': t.description, 'seq': seq, 'first_seen': rn
+            })
+
+    return sorted(rows, key=lambda row: (row['first_seen'], row['kind']))
+
+
+def sql_mode_insights(aggregates: TransactionAggregates) -> Dict:
+    """Insights the way the routes compute them in SQL aggregate mode"""
+    return FinancialDataProcessor([], snapshots=[aggregates]).process()
+
+
+RANGES = [
+    (None, None),
+    ('2024-02-01', '2024-03-15'),
+    ('2024-03-10', '2024-03-10'),  # a single day
+    ('2025-01-01', None),          # nothing in the range
+]
+
+
+@pytest.mark.parametrize('seed', range(10))
+@pytest.mark.parametrize('start_date,end_date', RANGES)
+def test_grouped_rows_match_python_engine(seed, start_date, end_date):
+    transactions = query_order(random_rows(seed, 300), start_date, end_date)
+
+    aggregates = TransactionAggregates.from_grouped_rows(grouped_rows(transactions))
+
+    assert_same_insights(sql_mode_insights(aggregates), FinancialDataProcessor(transactions).process())
+
+
+def test_ties_keep_first_seen_order():
+    # date DESC, id: the newest of equal amounts comes first and wins
+    rows = [
+        ('expense', 1000, 8, 'Older lunch', date(2024, 1, 1)),
+        ('income', 5000, 1, 'Older pay', date(2024, 1, 1)),
+        ('expense', 1000, 9, 'Newer bus', date(2024, 1, 2)),
+        ('income', 5000, 2, 'Newer gig', date(2024, 1, 2)),
+        ('expense', 1000, 8, 'Same day, later id', date(2024, 1, 2)),
+    ] + [('expense', 1000, 10, 'Filler', date(2024, 1, 3))] * 5 + [('expense', 90000, 11, 'Spike', date(2024, 1, 3))]
+    transactions = query_order(rows)
+
+    aggregates = TransactionAggregates.from_grouped_rows(grouped_rows(transactions))
+    expected = FinancialDataProcessor(transactions).process()
+
+    assert_same_insights(sql_mode_insights(aggregates), expected)
+    assert list(expected['income_analysis']['income_sources']) == ['Freelance', 'Salary']
+    assert expected['income_analysis']['largest_income']['date'] == '2024-01-02'
+
+
+def test_empty_range():
+    aggregates = TransactionAggregates.from_grouped_rows([])
+
+    assert aggregates.num_transactions == 0
+    assert_same_insights(sql_mode_insights(aggregates), FinancialDataProcessor([]).process())
+
+
+def insert_rows(conn, user_id: str, rows):
+    cursor = conn.cursor()
+    cursor.executemany(
+        "INSERT INTO transactions (user_id, type, amount, category_id, description, date) VALUES (%s, %s, %s, %s, %s, %s)",
+        [(user_id, kind, Decimal(cents).scaleb(-2), category_id, description, when)
+         for kind, cents, category_id, description, when in rows]
+    )
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('start_date,end_date', RANGES)
+def test_postgres_aggregates_match_python_engine(pg_conn, seed, start_date, end_date):
+    user_id = str(uuid.uuid4())
+    rows = random_rows(seed, 300)
+    insert_rows(pg_conn, user_id, rows)
+    insert_rows(pg_conn, str(uuid.uuid4()), random_rows(seed + 100, 50))  # someone else's
+
+    cursor = pg_conn.cursor()
+    cursor.execute(*queries.build_transactions_query(user_id, start_date, end_date))
+    transactions = [queries.transaction_from_row(row) for row in cursor.fetchall()]
+    assert [(t.type, t.amount, t.date) for t in transactions] == \
+        [(t.type, t.amount, t.date) for t in query_order(rows, start_date, end_date)]
+
+    cursor = pg_conn.cursor(row_factory=dict_row)
+    cursor.execute(*queries.build_aggregates_query(user_id, start_date, end_date))
+    aggregates = TransactionAggregates.from_grouped_rows(
+        queries.aggregate_row_from_row(row) for row in cursor.fetchall()
+    )
+
+    assert_same_insights(sql_mode_insights(aggregates), FinancialDataProcessor(transactions).process())
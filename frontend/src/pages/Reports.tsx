@@ -21,8 +21,9 @@ interface SavedReport {
   num_transactions: number;
   start_date: string | null;
   end_date: string | null;
-  report_text: string;
-  processed_insights: any;
+  // Not included in history summaries; loaded when the report is expanded
+  report_text?: string;
+  processed_insights?: any;
 }
 
 export const Reports: React.FC = () => {
@@ -73,8 +74,23 @@ export const Reports: React.FC = () => {
     }
   };
 
-  const toggleReport = (reportId: number) => {
-    setExpandedReportId(expandedReportId === reportId ? null : reportId);
+  const toggleReport = async (reportId: number) => {
+    if (expandedReportId === reportId) {
+      setExpandedReportId(null);
+      return;
+    }
+    setExpandedReportId(reportId);
+
+    const report = reportHistory.find((r) => r.id === reportId);
+    if (!token || !report || report.report_text !== undefined) return;
+    try {
+      const fullReport = await api.getReportById(token, reportId);
+      setReportHistory((history) =>
+        history.map((r) => (r.id === reportId ? { ...r, ...fullReport } : r))
+      );
+    } catch (error) {
+      console.error("Error fetching report:", error);
+    }
   };
 
   const deleteReport = async (reportId: number) => {
@@ -157,7 +157,8 @@ class ApiService {
     if (startDate) body.start_date = startDate;
     if (endDate) body.end_date = endDate;
 
-    const response = await fetch(`${this.reportsBaseUrl}/generate`, {
+    // Generation runs as a background job; poll until it finishes
+    const response = await fetch(`${this.reportsBaseUrl}/jobs`, {
       method: "POST",
       headers: this.getHeaders(token),
       body: JSON.stringify(body),
@@ -168,7 +169,27 @@ class ApiService {
       throw new Error(error.detail || "Failed to generate report");
     }
 
-    return response.json();
+    let job = await response.json();
+    while (job.status === "pending" || job.status === "running") {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+
+      const poll = await fetch(`${this.reportsBaseUrl}/jobs/${job.job_id}`, {
+        headers: this.getHeaders(token),
+      });
+
+      if (!poll.ok) {
+        const error = await poll.json();
+        throw new Error(error.detail || "Failed to generate report");
+      }
+
+      job = await poll.json();
+    }
+
+    if (job.status !== "done") {
+      throw new Error(job.error || "Failed to generate report");
+    }
+
+    return job.result;
   }
 
   async getInsights(token: string, startDate?: string, endDate?: string) {
@@ -193,10 +214,13 @@ class ApiService {
   async getReportHistory(
     token: string,
     limit: number = 10,
-    offset: number = 0
+    cursor?: string
   ) {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) params.append("cursor", cursor);
+
     const response = await fetch(
-      `${this.reportsBaseUrl}/history?limit=${limit}&offset=${offset}`,
+      `${this.reportsBaseUrl}/history?${params}`,
       {
         headers: this.getHeaders(token),
       }